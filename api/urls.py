@@ -0,0 +1,8 @@
+from django.contrib import admin
+from django.urls import path, include
+
+# Project URLconf (ROOT_URLCONF = 'api.urls')
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', include('products.urls')),  # Include products app URLs
+]
@@ -0,0 +1,264 @@
+# products/export.py
+import csv
+import datetime
+import gzip
+import io
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from scraping.schema import RETAILER_TABLES
+from .models import SAFETY_MARGIN, ExportWatermark, PriceHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional, compressed CSV always works
+    pa = pq = None
+
+SOURCES = ('price_history', 'products')
+FORMATS = ('csv', 'parquet')
+
+# Product has no retailer field, price history is matched to a retailer by its product URL
+RETAILER_DOMAINS = {
+    'ebc': 'ebc.shop',
+    'gjirafa50': 'gjirafa50.com',
+    'gjirafamall': 'gjirafamall.com',
+}
+
+PRICE_HISTORY_COLUMNS = [
+    ('id', 'int'), ('product_id', 'str'), ('product_name', 'str'), ('price', 'price'),
+    ('old_price', 'price'), ('discount', 'percent'), ('is_valid', 'bool'), ('valid_to', 'datetime'),
+    ('created_at', 'datetime'), ('updated_at', 'datetime'),
+]
+PRICE_HISTORY_FIELDS = ['id', 'product__product_id', 'product__product_name', 'price', 'old_price',
+                        'discount', 'is_valid', 'valid_to', 'created_at', 'updated_at']
+
+PRODUCTS_COLUMNS = [
+    ('retailer', 'str'), ('id', 'int'), ('product_id', 'str'), ('name', 'str'), ('price', 'price'),
+    ('promo_price', 'price'), ('image_url', 'str'), ('product_url', 'str'), ('updated_at', 'datetime'),
+]
+
+
+def parse_bound(value):
+    """Parses an ISO date or datetime query value into an aware datetime (None stays None)."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def price_history_chunks(retailer, start, end, changed_after, changed_until, chunk_size):
+    """
+    Yields PriceHistory rows as lists of tuples, chunk_size rows at a time.
+
+    Uses keyset pagination on the primary key, so every chunk is an index range scan and
+    memory stays constant no matter how much history is exported.
+    """
+    queryset = PriceHistory.objects.order_by('id')
+    if retailer:
+        queryset = queryset.filter(product__product_url__contains=RETAILER_DOMAINS[retailer])
+    if start:
+        queryset = queryset.filter(created_at__gte=start)
+    if end:
+        queryset = queryset.filter(created_at__lt=end)
+    if changed_after:
+        queryset = queryset.filter(updated_at__gt=changed_after)
+    if changed_until:
+        queryset = queryset.filter(updated_at__lte=changed_until)
+
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values_list(*PRICE_HISTORY_FIELDS)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def products_chunks(retailer, start, end, changed_after, changed_until, chunk_size):
+    """
+    Yields rows of the raw *_products tables, chunk_size rows at a time.
+
+    The tables live in the scrape database (settings.SCRAPE_DATABASE, defaulting to the
+    default connection) and are paged by primary key like price_history_chunks.
+
+    neptun_products is not exported: it has no product_id or promo_price and keeps the
+    price as the unparsed listing text, so it does not fit the shared numeric layout of
+    PRODUCTS_COLUMNS.
+    """
+    connection = connections[getattr(settings, 'SCRAPE_DATABASE', 'default')]
+    adapt = connection.ops.adapt_datetimefield_value
+    conditions, params = [], []
+    for column, operator, value in [('updated_at', '>=', start), ('updated_at', '<', end),
+                                    ('updated_at', '>', changed_after), ('updated_at', '<=', changed_until)]:
+        if value:
+            conditions.append(f'{column} {operator} %s')
+            params.append(adapt(value))
+    where = ''.join(f' AND {condition}' for condition in conditions)
+
+    for name in ([retailer] if retailer else list(RETAILER_TABLES)):
+        sql = f'''SELECT id, product_id, name, price, promo_price, image_url, product_url, updated_at
+                  FROM {RETAILER_TABLES[name]} WHERE id > %s{where} ORDER BY id LIMIT %s'''
+        last_id = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [last_id] + params + [chunk_size])
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            yield [(name,) + tuple(row) for row in rows]
+            last_id = rows[-1][0]
+
+
+class _ByteSink:
+    """A write-only file object that collects bytes until the export generator drains them."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_type(kind):
+    return {
+        'int': pa.int64(),
+        'str': pa.string(),
+        'price': pa.decimal128(10, 2),
+        'percent': pa.decimal128(5, 2),
+        'bool': pa.bool_(),
+        'datetime': pa.timestamp('us', tz='UTC'),
+    }[kind]
+
+
+def stream_csv_gz(columns, chunks):
+    """Encodes row chunks as gzip-compressed CSV, yielding the compressed bytes per chunk."""
+    sink = _ByteSink()
+    text = io.TextIOWrapper(gzip.GzipFile(fileobj=sink, mode='wb'), encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow([name for name, _ in columns])
+    for rows in chunks:
+        writer.writerows(rows)
+        text.flush()
+        yield sink.drain()
+    text.close()  # Writes the gzip trailer, the sink itself stays open
+    yield sink.drain()
+
+
+def stream_parquet(columns, chunks):
+    """Encodes row chunks as Parquet, one row group per chunk, yielding the bytes per chunk."""
+    schema = pa.schema([(name, arrow_type(kind)) for name, kind in columns])
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    for rows in chunks:
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+class Export:
+    """
+    A streaming export of price history or the raw products tables.
+
+    Iterating yields the encoded file in pieces, one database chunk at a time, so the
+    export runs in constant memory and can be written to a file or an HTTP response.
+
+    Rows can be limited to a retailer and a [start, end) date range. For incremental
+    exports only rows created or updated after a watermark are emitted: either an explicit
+    changed_since, or with incremental=True the watermark stored for this source and
+    retailer, which is advanced once the whole export has been produced. Incremental
+    exports always cover every date, so they cannot be combined with start or end.
+    """
+
+    def __init__(self, source='price_history', fmt='csv', retailer=None, start=None, end=None,
+                 changed_since=None, incremental=False, chunk_size=10000):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source '{source}', expected one of {', '.join(SOURCES)}")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+        if fmt == 'parquet' and pa is None:
+            raise ValueError("Parquet export requires pyarrow to be installed")
+        if retailer and retailer not in RETAILER_TABLES:
+            raise ValueError(f"Unknown retailer '{retailer}', expected one of {', '.join(RETAILER_TABLES)}")
+        if incremental and (start or end):
+            # The watermark is kept per source and retailer; a bounded export would advance
+            # it past rows outside the bounds that were never exported
+            raise ValueError("Incremental exports cannot be limited by start or end")
+
+        self.source = source
+        self.fmt = fmt
+        self.retailer = retailer
+        self.start = start
+        self.end = end
+        self.incremental = incremental
+        self.chunk_size = chunk_size
+        self.watermark_name = f"{source}:{retailer or 'all'}"
+
+        self.changed_after = changed_since
+        if incremental and changed_since is None:
+            watermark = ExportWatermark.objects.filter(name=self.watermark_name).first()
+            self.changed_after = watermark.exported_until if watermark else None
+        # Stop SAFETY_MARGIN in the past so rows committed late still fall into the next export;
+        # TIMESTAMP columns hold whole seconds, hence no microseconds
+        self.changed_until = None
+        if incremental or changed_since is not None:
+            self.changed_until = timezone.now().replace(microsecond=0) - SAFETY_MARGIN
+
+    @property
+    def filename(self):
+        suffix = 'parquet' if self.fmt == 'parquet' else 'csv.gz'
+        return f"{self.watermark_name.replace(':', '_')}_{timezone.now():%Y%m%d%H%M%S}.{suffix}"
+
+    @property
+    def content_type(self):
+        return 'application/vnd.apache.parquet' if self.fmt == 'parquet' else 'application/gzip'
+
+    def __iter__(self):
+        if self.source == 'price_history':
+            columns, chunk_source = PRICE_HISTORY_COLUMNS, price_history_chunks
+        else:
+            columns, chunk_source = PRODUCTS_COLUMNS, products_chunks
+        chunks = chunk_source(self.retailer, self.start, self.end, self.changed_after, self.changed_until,
+                              self.chunk_size)
+        encode = stream_parquet if self.fmt == 'parquet' else stream_csv_gz
+
+        for data in encode(columns, chunks):
+            if data:
+                yield data
+
+        if self.incremental:
+            ExportWatermark.objects.update_or_create(name=self.watermark_name,
+                                                     defaults={'exported_until': self.changed_until})
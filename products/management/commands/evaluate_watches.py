@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.watch import evaluate_changed_products
+
+
+class Command(BaseCommand):
+    help = 'Evaluates price watches against products changed since the last run. Run after each scrape.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        sent = evaluate_changed_products(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} price watch notifications.'))
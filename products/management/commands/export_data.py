@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.export import FORMATS, SOURCES, Export, parse_bound
+from scraping.schema import RETAILER_TABLES
+
+
+class Command(BaseCommand):
+    help = 'Exports price history or the scraped products tables as Parquet or gzip-compressed CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=SOURCES, default='price_history')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--retailer', choices=list(RETAILER_TABLES))
+        parser.add_argument('--start', help='Only rows from this date or datetime on (inclusive)')
+        parser.add_argument('--end', help='Only rows before this date or datetime (exclusive)')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only rows created or updated since the last incremental export '
+                                 '(cannot be combined with --start or --end)')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--output', help='Output file (defaults to a generated name)')
+
+    def handle(self, *args, **options):
+        try:
+            export = Export(
+                source=options['source'],
+                fmt=options['format'],
+                retailer=options['retailer'],
+                start=parse_bound(options['start']),
+                end=parse_bound(options['end']),
+                incremental=options['incremental'],
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as err:
+            raise CommandError(err)
+
+        output = options['output'] or export.filename
+        size = 0
+        with open(output, 'wb') as output_file:
+            for data in export:
+                output_file.write(data)
+                size += len(data)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {size} bytes to {output}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products.models import PriceHistory
+from scraping.schema import ensure_monthly_partitions
+
+
+class Command(BaseCommand):
+    help = 'Adds upcoming monthly partitions to the price history table (MySQL only).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'mysql':
+            self.stdout.write('Partitioning is only used on MySQL, nothing to do.')
+            return
+        with connection.cursor() as cursor:
+            ensure_monthly_partitions(cursor, PriceHistory._meta.db_table, options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS('Price history partitions are up to date.'))
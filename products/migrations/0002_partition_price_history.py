@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from scraping.schema import include_in_primary_key, partition_by_month
+
+
+def partition_price_history(apps, schema_editor):
+    """Range-partitions products_pricehistory by month of created_at (MySQL only)."""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = apps.get_model('products', 'PriceHistory')._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        # MySQL requires the partitioning column in the primary key
+        include_in_primary_key(cursor, table, 'created_at')
+        partition_by_month(cursor, table, 'created_at')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_price_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+WATCH_CURSOR_NAME = 'price_watch:products'
+
+
+def move_watch_cursor(apps, schema_editor):
+    """Moves the price watch position out of the export watermarks into its own table."""
+    ExportWatermark = apps.get_model('products', 'ExportWatermark')
+    WatchEvaluationCursor = apps.get_model('products', 'WatchEvaluationCursor')
+    watermark = ExportWatermark.objects.filter(name=WATCH_CURSOR_NAME).first()
+    if watermark:
+        WatchEvaluationCursor.objects.create(name=WATCH_CURSOR_NAME, evaluated_until=watermark.exported_until)
+        watermark.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_pricewatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchEvaluationCursor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('evaluated_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pricewatch',
+            name='last_seen_discount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.RunPython(move_watch_cursor, migrations.RunPython.noop),
+    ]
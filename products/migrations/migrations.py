@@ -1,16 +0,0 @@
-from django.db import migrations
-
-class Migration(migrations.Migration):
-    dependencies = [
-    ]
-
-    operations = [
-        migrations.RunSQL("""
-            CREATE OR REPLACE FUNCTION calculate_price_history()
-            RETURNS VOID AS $$
-            BEGIN
-                -- Your logic here
-            END;
-            $$ LANGUAGE plpgsql;
-        """),
-    ]
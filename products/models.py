@@ -1,5 +1,12 @@
+import datetime
+
 from django.db import models
 
+# Exports and price watches only read rows changed at least this long ago. updated_at is set
+# when a row is written, not when its transaction commits, so a slow scrape transaction can
+# commit rows stamped before a cutoff that has already been passed
+SAFETY_MARGIN = datetime.timedelta(minutes=5)
+
 class Product(models.Model):
     product_name = models.CharField(max_length=255)
     product_id = models.CharField(max_length=100, unique=True)  # Ensure product_id is unique
@@ -9,14 +16,15 @@ class Product(models.Model):
     product_url = models.URLField(max_length=200)
     image_url = models.URLField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Finds changed rows for price watches
 
     def __str__(self):
         return self.product_name
 
 
 class PriceHistory(models.Model):
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history') 
+    # No database-level FK: MySQL does not allow foreign keys on partitioned tables
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history', db_constraint=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     old_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     discount = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
@@ -27,6 +35,46 @@ class PriceHistory(models.Model):
 
     class Meta:
         ordering = ['-created_at']  # Order by latest first
+        indexes = [
+            models.Index(fields=['created_at'], name='pricehistory_created_idx'),  # Backs the default ordering
+            models.Index(fields=['product', 'created_at'], name='pricehistory_product_idx'),
+            models.Index(fields=['updated_at'], name='pricehistory_updated_idx'),  # Incremental exports
+        ]
 
     def __str__(self):
         return f"{self.product.product_name} Price History"
+
+
+class ExportWatermark(models.Model):
+    name = models.CharField(max_length=100, unique=True)  # One watermark per export source and filter
+    exported_until = models.DateTimeField()  # Rows changed up to this moment have been exported
+
+    def __str__(self):
+        return f"{self.name} exported until {self.exported_until}"
+
+
+class PriceWatch(models.Model):
+    email = models.EmailField()
+    product_id = models.CharField(max_length=100)  # Product.product_id of the watched product
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Alert at or below this price
+    notify_on_discount = models.BooleanField(default=False)  # Alert when the product gains a discount
+    is_active = models.BooleanField(default=True)
+    last_notified_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    last_seen_discount = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # Product discount at the last evaluation
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product_id', 'max_price'], name='pricewatch_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} watching {self.product_id}"
+
+
+class WatchEvaluationCursor(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    evaluated_until = models.DateTimeField()  # Products changed up to this moment have been evaluated
+
+    def __str__(self):
+        return f"{self.name} evaluated until {self.evaluated_until}"
@@ -1,8 +1,22 @@
 # products/serializers.py
 from rest_framework import serializers
-from .models import Product
+from .models import PriceWatch, Product
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
+
+class PriceWatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceWatch
+        fields = '__all__'
+        read_only_fields = ['email', 'last_notified_price', 'last_seen_discount', 'created_at']
+
+    def validate(self, attrs):
+        # Partial updates are checked against the watch's current settings
+        max_price = attrs.get('max_price', getattr(self.instance, 'max_price', None))
+        notify_on_discount = attrs.get('notify_on_discount', getattr(self.instance, 'notify_on_discount', False))
+        if max_price is None and not notify_on_discount:
+            raise serializers.ValidationError('Set max_price, notify_on_discount or both, otherwise the watch never triggers.')
+        return attrs
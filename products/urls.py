@@ -1,14 +1,11 @@
 from django.urls import path
-from .views import ProductListCreateView, ProductDetailView
-from django.contrib import admin
-from django.urls import path, include
+from .views import ProductListCreateView, ProductDetailView, PriceWatchListCreateView, PriceWatchDetailView, ExportView
 
+# App routes, mounted under api/ by the project URLconf (api/urls.py)
 urlpatterns = [
     path('products/', ProductListCreateView.as_view(), name='product-list-create'),
     path('products/<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
+    path('watches/', PriceWatchListCreateView.as_view(), name='price-watch-list-create'),
+    path('watches/<int:pk>/', PriceWatchDetailView.as_view(), name='price-watch-detail'),
+    path('export/', ExportView.as_view(), name='export'),
 ]
-
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/', include('products.urls')),  # Include products app URLs
-]
\ No newline at end of file
@@ -1,7 +1,12 @@
 # products/views.py
-from rest_framework import generics
-from .models import Product
-from .serializers import ProductSerializer
+from django.http import StreamingHttpResponse
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .export import Export, parse_bound
+from .models import PriceWatch, Product
+from .serializers import PriceWatchSerializer, ProductSerializer
 
 class ProductListCreateView(generics.ListCreateAPIView):
     queryset = Product.objects.all()
@@ -10,3 +15,70 @@ class ProductListCreateView(generics.ListCreateAPIView):
 class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+
+class OwnPriceWatchesMixin:
+    """Limits price watches to the signed-in user's, matched by the email they are sent to."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if not self.request.user.email:
+            return PriceWatch.objects.none()
+        return PriceWatch.objects.filter(email=self.request.user.email)
+
+    def fresh_state(self, product_id):
+        """
+        Returns the notification state of a new or retargeted watch. It starts from the
+        product's current discount so only a newly gained discount notifies.
+        """
+        product = Product.objects.filter(product_id=product_id).first()
+        return {'last_notified_price': None, 'last_seen_discount': product.discount if product else None}
+
+class PriceWatchListCreateView(OwnPriceWatchesMixin, generics.ListCreateAPIView):
+    serializer_class = PriceWatchSerializer
+
+    def perform_create(self, serializer):
+        if not self.request.user.email:
+            raise ValidationError({'email': 'Your account needs an email address to receive price alerts.'})
+        serializer.save(email=self.request.user.email, **self.fresh_state(serializer.validated_data['product_id']))
+
+class PriceWatchDetailView(OwnPriceWatchesMixin, generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = PriceWatchSerializer
+
+    def perform_update(self, serializer):
+        # A watch moved to another product or threshold starts over, its old state no longer applies
+        watch, data = serializer.instance, serializer.validated_data
+        if any(field in data and data[field] != getattr(watch, field)
+               for field in ('product_id', 'max_price', 'notify_on_discount')):
+            serializer.save(**self.fresh_state(data.get('product_id', watch.product_id)))
+        else:
+            serializer.save()
+
+class ExportView(APIView):
+    """
+    Streams price history or the scraped products tables as gzip-compressed CSV or Parquet.
+
+    Query parameters: source, file_format (csv or parquet), retailer, start, end and
+    changed_since. For incremental pulls, pass the X-Export-Until header of the previous
+    response as changed_since. Exports read whole tables, so they are limited to staff.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            export = Export(
+                source=params.get('source', 'price_history'),
+                fmt=params.get('file_format', 'csv'),
+                retailer=params.get('retailer'),
+                start=parse_bound(params.get('start')),
+                end=parse_bound(params.get('end')),
+                changed_since=parse_bound(params.get('changed_since')),
+            )
+        except ValueError as err:
+            return Response({'detail': str(err)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(export, content_type=export.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+        if export.changed_until:
+            response['X-Export-Until'] = export.changed_until.isoformat()
+        return response
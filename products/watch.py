@@ -0,0 +1,194 @@
+# products/watch.py
+import abc
+import bisect
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import SAFETY_MARGIN, PriceWatch, Product, WatchEvaluationCursor
+
+# Name of the WatchEvaluationCursor row tracking how far product changes have been evaluated
+CURSOR_NAME = 'price_watch:products'
+
+
+class Notification:
+    """A triggered watch together with the product state that triggered it."""
+
+    def __init__(self, watch, product, reason):
+        self.watch = watch
+        self.product = product
+        self.reason = reason  # 'price' or 'discount'
+
+    def __repr__(self):
+        return f'Notification(watch={self.watch.pk}, product={self.product.product_id}, reason={self.reason})'
+
+
+class NotificationSink(abc.ABC):
+    """Delivers batches of notifications."""
+
+    @abc.abstractmethod
+    def send_batch(self, notifications):
+        """Sends a list of Notification objects, raising if they could not be delivered."""
+
+
+class EmailSink(NotificationSink):
+    """Sends one email per notification over a single mail connection per batch."""
+
+    def send_batch(self, notifications):
+        messages = []
+        for notification in notifications:
+            product = notification.product
+            if notification.reason == 'discount':
+                subject = f"{product.product_name} is now {product.discount}% off"
+            else:
+                subject = f"{product.product_name} dropped to {product.price}"
+            body = f"{product.product_name} now costs {product.price}.\n{product.product_url}"
+            messages.append((subject, body, None, [notification.watch.email]))
+        send_mass_mail(messages, fail_silently=False)
+
+
+class MemorySink(NotificationSink):
+    """Keeps sent batches in memory; a local stand-in for tests and dry runs."""
+
+    def __init__(self):
+        self.batches = []
+
+    def send_batch(self, notifications):
+        self.batches.append(list(notifications))
+
+
+def get_sink():
+    """Returns the sink configured by settings.PRICE_WATCH_SINK (a dotted path), email by default."""
+    return import_string(getattr(settings, 'PRICE_WATCH_SINK', 'products.watch.EmailSink'))()
+
+
+class WatchIndex:
+    """
+    Active watches of a set of products, indexed by product_id.
+
+    Price thresholds are kept sorted per product, so finding the watches a new price
+    triggers is a binary search rather than a scan over every watch of the product.
+    """
+
+    def __init__(self, watches=()):
+        self.thresholds = defaultdict(list)  # product_id -> sorted [(max_price, watch id)]
+        self.notified = defaultdict(set)  # product_id -> ids of price watches waiting to be re-armed
+        self.discount_watches = defaultdict(list)  # product_id -> [watch]
+        self.watches = {}
+        self.changed = {}  # watch id -> watch whose state changed without a notification
+        for watch in watches:
+            self.add(watch)
+
+    def add(self, watch):
+        self.watches[watch.pk] = watch
+        if watch.max_price is not None:
+            bisect.insort(self.thresholds[watch.product_id], (watch.max_price, watch.pk))
+            if watch.last_notified_price is not None:
+                self.notified[watch.product_id].add(watch.pk)
+        if watch.notify_on_discount:
+            self.discount_watches[watch.product_id].append(watch)
+
+    def evaluate(self, product):
+        """
+        Returns notifications for the watches triggered by a product's current state.
+
+        A price watch is not triggered again until the price falls below the price it last
+        notified about, or rises above max_price (which re-arms it) and drops back. A discount
+        watch is triggered when the product gains a discount it did not have at the previous
+        evaluation. Watches whose state changed without a notification are collected in
+        changed for the caller to save.
+        """
+        notifications = []
+        notified = set()
+
+        entries = self.thresholds.get(product.product_id, [])
+        position = bisect.bisect_left(entries, (product.price,))
+        # Every threshold at or above the price is triggered
+        for _, watch_pk in entries[position:]:
+            watch = self.watches[watch_pk]
+            if watch.last_notified_price is None or product.price < watch.last_notified_price:
+                notifications.append(Notification(watch, product, 'price'))
+                notified.add(watch_pk)
+                self.notified[product.product_id].add(watch_pk)
+
+        # The price is above the thresholds of the remaining notified watches, re-arm them
+        waiting = self.notified.get(product.product_id, set())
+        for watch_pk in [pk for pk in waiting if self.watches[pk].max_price < product.price]:
+            waiting.discard(watch_pk)
+            self.watches[watch_pk].last_notified_price = None
+            self.changed[watch_pk] = self.watches[watch_pk]
+
+        for watch in self.discount_watches.get(product.product_id, []):
+            gained = product.discount and not watch.last_seen_discount
+            if watch.last_seen_discount != product.discount:
+                watch.last_seen_discount = product.discount
+                self.changed[watch.pk] = watch
+            if gained and watch.pk not in notified:
+                notifications.append(Notification(watch, product, 'discount'))
+                notified.add(watch.pk)
+
+        # Notified watches are saved once their notification was delivered
+        for watch_pk in notified:
+            self.changed.pop(watch_pk, None)
+        return notifications
+
+
+def evaluate_changed_products(sink=None, chunk_size=1000, batch_size=500):
+    """
+    Evaluates price watches against the products changed since the last evaluation.
+
+    Only changed products are read, and only the watches of those products are loaded,
+    so the cost follows the number of changes rather than watches times catalog.
+    Notifications are delivered to the sink in batches of batch_size. Products changed
+    within SAFETY_MARGIN of now are left for the next evaluation.
+
+    Returns:
+        int: The number of notifications sent.
+    """
+    sink = sink or get_sink()
+    cursor = WatchEvaluationCursor.objects.filter(name=CURSOR_NAME).first()
+    changed_until = timezone.now() - SAFETY_MARGIN
+
+    changed = Product.objects.filter(updated_at__lte=changed_until).order_by('id')
+    if cursor:
+        changed = changed.filter(updated_at__gt=cursor.evaluated_until)
+
+    sent = 0
+    pending = []
+    last_id = 0
+    while True:
+        products = list(changed.filter(id__gt=last_id)[:chunk_size])
+        if not products:
+            break
+        last_id = products[-1].id
+
+        index = WatchIndex(PriceWatch.objects.filter(is_active=True,
+                                                     product_id__in=[p.product_id for p in products]))
+        for product in products:
+            pending.extend(index.evaluate(product))
+        PriceWatch.objects.bulk_update(index.changed.values(), ['last_notified_price', 'last_seen_discount'])
+
+        while len(pending) >= batch_size:
+            sent += _deliver(sink, pending[:batch_size])
+            pending = pending[batch_size:]
+
+    if pending:
+        sent += _deliver(sink, pending)
+
+    WatchEvaluationCursor.objects.update_or_create(name=CURSOR_NAME, defaults={'evaluated_until': changed_until})
+    return sent
+
+
+def _deliver(sink, notifications):
+    """Sends a batch and records the notified state so the same drop or discount is not reported twice."""
+    sink.send_batch(notifications)
+    watches = []
+    for notification in notifications:
+        if notification.reason == 'price':
+            notification.watch.last_notified_price = notification.product.price
+        watches.append(notification.watch)
+    PriceWatch.objects.bulk_update(watches, ['last_notified_price', 'last_seen_discount'])
+    return len(notifications)
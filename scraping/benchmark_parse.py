@@ -0,0 +1,86 @@
+"""
+Times the parse stage of run_pipeline on saved pages, in one process and in a
+process pool, and prints the speedup.
+
+Save listing pages first, one file per page (for gjirafa50 save the 'html' field
+of the search JSON), for example:
+
+    mkdir pages && for i in $(seq 1 50); do
+        curl -s "https://gjirafamall.com/kozmetike-3?s=72&i=$i" -o pages/$i.html; done
+
+then compare single-process parsing against 16 parse workers:
+
+    python -m scraping.benchmark_parse gjirafamall pages/ --workers 16
+
+Pages are read from disk, so the numbers measure parsing rather than the network.
+"""
+import argparse
+import glob
+import os
+import time
+
+if __package__:
+    from .crawl import run_pipeline
+    from .ebc import parse_page as parse_ebc_page
+    from .gjirafa50 import GjirafaScraper
+    from .gjirafamall import parse_page as parse_gjirafamall_page
+else:  # Run as a script, e.g. python scraping/benchmark_parse.py
+    from crawl import run_pipeline
+    from ebc import parse_page as parse_ebc_page
+    from gjirafa50 import GjirafaScraper
+    from gjirafamall import parse_page as parse_gjirafamall_page
+
+PARSERS = {
+    'ebc': parse_ebc_page,
+    'gjirafa50': GjirafaScraper.parse_product_data,
+    'gjirafamall': parse_gjirafamall_page,
+}
+
+
+def read_page(path):
+    """Reads a saved page; stands in for the fetch step."""
+    with open(path, encoding='utf-8') as page_file:
+        return page_file.read()
+
+
+def time_parsing(paths, parse, parse_workers, io_workers=4):
+    """
+    Runs the pipeline over the saved pages.
+
+    Returns:
+        tuple: (seconds elapsed, number of rows parsed).
+    """
+    rows = 0
+    start = time.perf_counter()
+    for _, page_rows, err in run_pipeline(paths, read_page, parse, io_workers=io_workers,
+                                          parse_workers=parse_workers):
+        if err is not None:
+            raise err
+        rows += len(page_rows)
+    return time.perf_counter() - start, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('retailer', choices=sorted(PARSERS))
+    parser.add_argument('pages_dir', help='Directory of saved pages')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Parse processes to compare against')
+    parser.add_argument('--repeat', type=int, default=1, help='Parse every page this many times')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.pages_dir, '*'))) * args.repeat
+    if not paths:
+        parser.error(f"No pages found in {args.pages_dir}")
+    parse = PARSERS[args.retailer]
+
+    baseline, rows = time_parsing(paths, parse, parse_workers=0)
+    print(f"single process: {len(paths)} pages, {rows} rows in {baseline:.2f}s "
+          f"({len(paths) / baseline:.1f} pages/s)")
+    pooled, rows = time_parsing(paths, parse, parse_workers=args.workers)
+    print(f"{args.workers} parse workers: {len(paths)} pages, {rows} rows in {pooled:.2f}s "
+          f"({len(paths) / pooled:.1f} pages/s)")
+    print(f"speedup: {baseline / pooled:.2f}x on {os.cpu_count()} cores")
+
+
+if __name__ == '__main__':
+    main()
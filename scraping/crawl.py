@@ -0,0 +1,218 @@
+import datetime
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import requests
+
+# Responses worth retrying: rate limiting and gateway/server hiccups
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def fetch_with_retries(url, session=None, retries=4, backoff=2.0, timeout=30, **kwargs):
+    """
+    Fetches a URL, retrying transient failures with exponential backoff.
+
+    Connection errors, timeouts and the status codes in TRANSIENT_STATUS_CODES are
+    retried; any other HTTP error is raised immediately.
+
+    Args:
+        url (str): The URL to fetch.
+        session (requests.Session or None): Session to use, defaults to plain requests.
+        retries (int): Number of retries after the first attempt.
+        backoff (float): Delay in seconds before the first retry, doubled after each one.
+        timeout (int): Request timeout in seconds.
+
+    Returns:
+        requests.Response: The successful response.
+
+    Raises:
+        requests.RequestException: If the last attempt still fails.
+    """
+    http = session or requests
+    delay = backoff
+    for attempt in range(retries + 1):
+        try:
+            response = http.get(url, timeout=timeout, **kwargs)
+            if response.status_code not in TRANSIENT_STATUS_CODES:
+                response.raise_for_status()
+                return response
+            error = requests.HTTPError(f"{response.status_code} for url: {url}", response=response)
+        except (requests.ConnectionError, requests.Timeout) as err:
+            error = err
+
+        if attempt == retries:
+            raise error
+        print(f"Transient error fetching {url} ({error}), retrying in {delay:.0f}s")
+        time.sleep(delay)
+        delay *= 2
+
+
+def is_resumable(run_started_at, now, max_age):
+    """Returns True if a run started at run_started_at is recent enough to be resumed at now."""
+    return run_started_at is not None and now - run_started_at <= max_age
+
+
+class CrawlCheckpoint:
+    """
+    Durable record of the pages a crawl run has already completed.
+
+    A page is marked complete in the same transaction that inserts its rows, so
+    after a crash the checkpoint and the products table always agree and a
+    restarted crawl only needs to fetch the pages that are missing.
+
+    Checkpoints belong to a run identified by its start time. A run older than
+    max_age is not resumed: its checkpoints are discarded and a fresh crawl
+    starts, so pages saved by an old run are scraped again instead of going stale.
+
+    The crawl_checkpoints table is created by the scrape schema migrations (see
+    scraping/schema.py), so run migrate() on the connection first.
+    """
+
+    def __init__(self, db_connection, crawl_name, max_age=datetime.timedelta(hours=12)):
+        """
+        Args:
+            db_connection: An open MySQL connection, shared with the rows being saved.
+            crawl_name (str): Identifies the crawl, e.g. the retailer name.
+            max_age (timedelta): How long after its start an unfinished run may be resumed.
+        """
+        self.db_connection = db_connection
+        self.crawl_name = crawl_name
+        self.max_age = max_age
+        self.run_started_at = None
+
+    def begin(self):
+        """
+        Resumes the unfinished run if it is recent enough, otherwise starts a fresh run.
+
+        Returns:
+            set: Page numbers already completed by the run (empty for a fresh run).
+        """
+        cursor = self.db_connection.cursor()
+        cursor.execute('SELECT NOW()')
+        (now,) = cursor.fetchone()
+        cursor.execute('SELECT MIN(run_started_at) FROM crawl_checkpoints WHERE crawl_name = %s',
+                       (self.crawl_name,))
+        (run_started_at,) = cursor.fetchone()
+        cursor.close()
+
+        if is_resumable(run_started_at, now, self.max_age):
+            self.run_started_at = run_started_at
+            return self.completed_pages()
+
+        self.clear()
+        self.run_started_at = now
+        return set()
+
+    def completed_pages(self):
+        """Returns the set of page numbers completed by the current run."""
+        cursor = self.db_connection.cursor()
+        cursor.execute('SELECT page FROM crawl_checkpoints WHERE crawl_name = %s AND run_started_at = %s',
+                       (self.crawl_name, self.run_started_at))
+        pages = {page for (page,) in cursor.fetchall()}
+        cursor.close()
+        return pages
+
+    def mark_completed(self, cursor, page, row_count):
+        """
+        Records a page as completed by the current run.
+
+        The caller commits, so this must be executed on the cursor that inserted
+        the page's rows.
+        """
+        cursor.execute('''INSERT INTO crawl_checkpoints (crawl_name, page, row_count, run_started_at)
+                          VALUES (%s, %s, %s, %s)
+                          ON DUPLICATE KEY UPDATE row_count = VALUES(row_count),
+                          run_started_at = VALUES(run_started_at)''',
+                       (self.crawl_name, page, row_count, self.run_started_at))
+
+    def clear(self):
+        """Forgets all completed pages so the next run starts a fresh crawl."""
+        cursor = self.db_connection.cursor()
+        cursor.execute('DELETE FROM crawl_checkpoints WHERE crawl_name = %s', (self.crawl_name,))
+        self.db_connection.commit()
+        cursor.close()
+
+
+# Marks the end of the pages iterator in run_pipeline
+_NO_PAGE = object()
+
+
+def run_pipeline(pages, fetch, parse, io_workers=4, parse_workers=None):
+    """
+    Fetches pages in a thread pool and parses them in a process pool.
+
+    BeautifulSoup parsing is CPU-bound and holds the GIL, so it runs in separate
+    processes while threads keep the network busy. Only the raw body goes to a
+    parse worker and only the parsed row tuples come back, so no soup objects
+    cross the process boundary. Parse workers share nothing, so parse throughput
+    grows with the number of workers up to the core count, until fetching
+    becomes the bottleneck. Use parse_workers=0 to parse in the calling process,
+    which is the single-process baseline; scraping/benchmark_parse.py times it
+    against a process pool on saved pages and reports the speedup.
+
+    Besides one page per parse worker being parsed, at most io_workers * 2 pages are
+    being fetched or waiting for a parse worker, so bodies do not pile up in memory
+    when parsing or the consumer is slower than the network, while every parse
+    worker can stay busy. If the consumer stops early or raises, queued fetches are
+    cancelled.
+
+    Args:
+        pages (iterable): Page numbers to process.
+        fetch (callable): fetch(page) -> body; runs in a worker thread.
+        parse (callable): parse(body) -> list of row tuples; must be a module-level
+            function so it can be sent to a worker process.
+        io_workers (int): Number of concurrent fetches.
+        parse_workers (int or None): Number of parse processes (defaults to the CPU
+            count, 0 parses inline).
+
+    Yields:
+        tuple: (page, rows, error) in completion order. When fetching a page
+        failed, rows is None and error holds the requests exception.
+    """
+    if parse_workers is None:
+        parse_workers = os.cpu_count() or 1
+    max_in_flight = parse_workers + io_workers * 2
+    pages = iter(pages)
+    fetches, parses, pending = {}, {}, set()
+
+    io_pool = ThreadPoolExecutor(max_workers=io_workers)
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers != 0 else None
+    try:
+        while True:
+            # Top up the fetches, counting bodies being parsed or waiting for a parse worker
+            while len(fetches) + len(parses) < max_in_flight:
+                page = next(pages, _NO_PAGE)
+                if page is _NO_PAGE:
+                    break
+                future = io_pool.submit(fetch, page)
+                fetches[future] = page
+                pending.add(future)
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            pending -= done
+            for future in done:
+                if future in parses:
+                    yield parses.pop(future), future.result(), None
+                    continue
+
+                page = fetches.pop(future)
+                try:
+                    body = future.result()
+                except requests.RequestException as err:
+                    yield page, None, err
+                    continue
+
+                if parse_pool is None:
+                    yield page, parse(body), None
+                else:
+                    parse_future = parse_pool.submit(parse, body)
+                    parses[parse_future] = page
+                    pending.add(parse_future)
+    finally:
+        io_pool.shutdown(cancel_futures=True)
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+
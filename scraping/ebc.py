@@ -1,7 +1,13 @@
-import requests
 from bs4 import BeautifulSoup
 import mysql.connector
 
+if __package__:
+    from .crawl import CrawlCheckpoint, fetch_with_retries, run_pipeline
+    from .schema import delete_unseen_products, migrate, upsert_products_sql
+else:  # Run as a script, e.g. python scraping/ebc.py
+    from crawl import CrawlCheckpoint, fetch_with_retries, run_pipeline
+    from schema import delete_unseen_products, migrate, upsert_products_sql
+
 class Product:
     """
     Represents a product with its details.
@@ -49,9 +55,11 @@ class Scraper:
         num_pages (int): The number of pages to scrape.
         products (list): A list to store Product instances.
         db_config (dict): Database configuration for MySQL connection.
+        io_workers (int): Number of pages fetched concurrently.
+        parse_workers (int or None): Number of parse processes (None uses every core, 0 parses in-process).
     """
 
-    def __init__(self, base_url, num_pages, db_config):
+    def __init__(self, base_url, num_pages, db_config, io_workers=4, parse_workers=None):
         """
         Initializes a Scraper instance.
 
@@ -59,15 +67,19 @@ class Scraper:
             base_url (str): The base URL of the website to scrape.
             num_pages (int): The number of pages to scrape.
             db_config (dict): Database configuration for MySQL connection.
+            io_workers (int): Number of pages fetched concurrently.
+            parse_workers (int or None): Number of parse processes (None uses every core, 0 parses in-process).
         """
         self.base_url = base_url
         self.num_pages = num_pages
         self.products = []
         self.db_config = db_config  # Database configuration
+        self.io_workers = io_workers
+        self.parse_workers = parse_workers
 
     def fetch_page(self, page_url):
         """
-        Fetches the HTML content of a page.
+        Fetches the HTML content of a page, retrying transient failures.
 
         Args:
             page_url (str): The URL of the page to fetch.
@@ -75,20 +87,25 @@ class Scraper:
         Returns:
             str: The HTML content of the page.
         """
-        response = requests.get(page_url)
+        response = fetch_with_retries(page_url)
         return response.text
 
-    def parse_product(self, product_html):
+    def fetch_listing(self, page):
+        """Fetches the HTML content of a numbered listing page."""
+        return self.fetch_page(f"{self.base_url}?page={page}")
+
+    @staticmethod
+    def parse_product(product_html):
         """
         Parses the HTML of a product to extract its details.
 
         Args:
-            product_html (str): The HTML content of the product.
+            product_html (str or Tag): The HTML content of the product, or its already parsed element.
 
         Returns:
             Product: An instance of the Product class with extracted details.
         """
-        soup = BeautifulSoup(product_html, 'html.parser')
+        soup = BeautifulSoup(product_html, 'html.parser') if isinstance(product_html, str) else product_html
         name = soup.find('h4', class_='product_name').get_text(strip=True)
         price = float(soup.find('span', class_='current_price').get_text(strip=True).replace('€', '').replace(',', '.'))
         promo_price_tag = soup.find('span', class_='discount_price')
@@ -103,57 +120,81 @@ class Scraper:
         return Product(name=name, price=price, promo_price=promo_price, image_url=image_url, product_url=product_url, product_id=product_id)
 
 
-    def save_to_mysql(self):
+    def insert_products(self, cursor, products):
+        """Inserts or updates products by product_id using the given cursor; the caller commits."""
+        cursor.executemany(upsert_products_sql('ebc_products', ['name', 'price', 'promo_price', 'image_url',
+                                                            'product_url', 'product_id']),
+                           [(product.name, product.price, product.promo_price, product.image_url,
+                             product.product_url, product.product_id) for product in products])
+
+    def scrape(self):
         """
-        Saves the scraped products to a MySQL database.
-        Creates the products table if it doesn't exist and inserts each product into the database.
+        Scrapes product information from multiple pages of the website.
+
+        Pages are fetched by I/O threads and parsed in a process pool (see run_pipeline).
+        Each page's products are saved to MySQL together with a checkpoint in a single
+        transaction. An interrupted crawl resumes with the pages that are still missing
+        as long as it is recent (see CrawlCheckpoint); pages that keep failing after
+        retries are skipped and picked up by the next run.
         """
-        # Establish a database connection
         conn = mysql.connector.connect(**self.db_config)
         cursor = conn.cursor()
+        migrate(conn)
+        checkpoint = CrawlCheckpoint(conn, 'ebc')
+
+        completed_pages = checkpoint.begin()
+        if completed_pages:
+            print(f"Resuming crawl, {len(completed_pages)} pages already saved")
+
+        failed_pages = []
+        missing_pages = [page for page in range(1, self.num_pages + 1) if page not in completed_pages]
+        for page, rows, err in run_pipeline(missing_pages, self.fetch_listing, parse_page,
+                                            io_workers=self.io_workers, parse_workers=self.parse_workers):
+            if err is not None:
+                print(f"Giving up on page {page}: {err}")
+                failed_pages.append(page)
+                continue
+
+            products = [Product(*row) for row in rows]
+            self.insert_products(cursor, products)
+            checkpoint.mark_completed(cursor, page, len(products))
+            conn.commit()
+            self.products.extend(products)
+
+        if failed_pages:
+            print(f"Pages {failed_pages} failed, run the scraper again to resume")
+        else:
+            # Every page was saved, so products this run did not see have been delisted
+            removed = delete_unseen_products(cursor, 'ebc_products', checkpoint.run_started_at)
+            conn.commit()
+            print(f"Removed {removed} delisted products")
+            checkpoint.clear()
 
-        # Create the products table if it doesn't exist
-        cursor.execute('''CREATE TABLE IF NOT EXISTS ebc_products (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            name VARCHAR(255),
-                            price DECIMAL(10, 2),
-                            promo_price DECIMAL(10, 2),
-                            image_url VARCHAR(255),
-                            product_url VARCHAR(255),
-                            product_id VARCHAR(100)
-                        )''')
-        
-        cursor.execute('''TRUNCATE TABLE ebc_products''')
-
-        # Insert products into the database
-        for product in self.products:
-            cursor.execute('''INSERT INTO ebc_products (name, price, promo_price, image_url, product_url, product_id)
-                              VALUES (%s, %s, %s, %s, %s, %s)''',
-                           (product.name, product.price, product.promo_price, product.image_url, product.product_url, product.product_id))
-
-        # Commit the transaction and close the connection
-        conn.commit()
         cursor.close()
         conn.close()
 
-    def scrape(self):
-        """
-        Scrapes product information from multiple pages of the website.
 
-        Iterates over the specified number of pages and extracts product details,
-        storing them in the products list.
-        """
-        for page in range(1, self.num_pages + 1):
-            page_url = f"{self.base_url}?page={page}"
-            page_html = self.fetch_page(page_url)
-            soup = BeautifulSoup(page_html, 'html.parser')
+def parse_page(page_html):
+    """
+    Parses every product on a listing page.
+
+    Module-level so it can run in a parse worker process; it returns plain row
+    tuples in Product argument order rather than soup or Product objects.
 
-            product_elements = soup.find_all('article', class_='single_product')
+    Args:
+        page_html (str): The HTML content of the listing page.
+
+    Returns:
+        list: (name, price, promo_price, image_url, product_url, product_id) tuples.
+    """
+    soup = BeautifulSoup(page_html, 'html.parser')
+    rows = []
+    for product_element in soup.find_all('article', class_='single_product'):
+        product = Scraper.parse_product(product_element)
+        rows.append((product.name, product.price, product.promo_price, product.image_url,
+                     product.product_url, product.product_id))
+    return rows
 
-            for product_element in product_elements:
-                product_html = str(product_element)
-                product = self.parse_product(product_html)
-                self.products.append(product)
 
 if __name__ == "__main__":
     # Database configuration
@@ -165,5 +206,4 @@ if __name__ == "__main__":
     }
 
     scraper = Scraper('https://ebc.shop/category/FRG', num_pages=26, db_config=db_config)
-    scraper.scrape()
-    scraper.save_to_mysql()  # Save products to MySQL
+    scraper.scrape()  # Saves products to MySQL page by page
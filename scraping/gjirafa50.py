@@ -2,16 +2,28 @@ import requests
 from bs4 import BeautifulSoup
 import mysql.connector
 
+if __package__:
+    from .crawl import fetch_with_retries, run_pipeline
+    from .schema import delete_unseen_products, migrate, upsert_products_sql
+else:  # Run as a script, e.g. python scraping/gjirafa50.py
+    from crawl import fetch_with_retries, run_pipeline
+    from schema import delete_unseen_products, migrate, upsert_products_sql
+
 class GjirafaScraper:
-    def __init__(self, base_url, headers, db_config):
+    def __init__(self, base_url, headers, db_config, io_workers=4, parse_workers=None):
         """
         Initialize the scraper with the base URL, HTTP headers, and database configuration.
         Establish a connection to the MySQL database.
+
+        io_workers pages are fetched concurrently and parse_workers processes parse them
+        (None uses every core, 0 parses in this process).
         """
         self.base_url = base_url
         self.headers = headers
         self.total_pages = 0 
         self.db_config = db_config
+        self.io_workers = io_workers
+        self.parse_workers = parse_workers
         self.db_connection = self.connect_to_db()
 
     def connect_to_db(self):
@@ -28,18 +40,35 @@ class GjirafaScraper:
             print(f"Error: {err}")
             return None
 
-    def get_json_data(self, page_number=1):
-        """Fetch the JSON content from the search URL for a specific page."""
+    def request_json(self, page_number):
+        """
+        Fetch the search JSON of a page, retrying transient errors.
+
+        Raises:
+            requests.RequestException: If the page could not be fetched or is not JSON.
+        """
         url = f'{self.base_url}/product/search?pagenumber={page_number}&_=1729075655885'
-        response = requests.get(url, headers=self.headers)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
+        return fetch_with_retries(url, headers=self.headers).json()
+
+    def get_json_data(self, page_number=1):
+        """Fetch the JSON content from the search URL for a specific page, None if it failed."""
+        try:
+            return self.request_json(page_number)
+        except requests.RequestException as err:
+            print(f"Failed to fetch page {page_number}: {err}")
             return None
 
-    def parse_product_data(self, product_html):
-        """Extract product details from the HTML content and return a list of products."""
+    def fetch_product_html(self, page_number):
+        """Fetch the product HTML of a page, raising if the page could not be fetched."""
+        return self.request_json(page_number).get('html', '')
+
+    @staticmethod
+    def parse_product_data(product_html):
+        """
+        Extract product details from the HTML content and return a list of products.
+
+        A staticmethod that returns plain lists, so it can run in a parse worker process.
+        """
         soup = BeautifulSoup(product_html, 'html.parser')
         product_items = soup.find_all('div', class_='item-box')
         products = []
@@ -47,14 +76,15 @@ class GjirafaScraper:
         for product in product_items:
             product_item = product.find('div', class_='product-item')
 
-            product_id = product_item['data-productid'] if product_item and 'data-productid' in product_item.attrs else 'N/A'
+            # NULL rather than 'N/A', so products without an id don't collide on the unique key
+            product_id = product_item['data-productid'] if product_item and 'data-productid' in product_item.attrs else None
             product_name = product_item['onclick'].split('`')[1] if product_item and 'onclick' in product_item.attrs else 'N/A'
             
             promo_price_tag = product.find('span', class_='price')  # This is now promo_price
-            promo_price = self.clean_price(promo_price_tag.text.strip()) if promo_price_tag else None
+            promo_price = GjirafaScraper.clean_price(promo_price_tag.text.strip()) if promo_price_tag else None
 
             price_tag = product.find('span', class_='old-price')  # This is now the original price
-            price = self.clean_price(price_tag.text.strip()) if price_tag else None
+            price = GjirafaScraper.clean_price(price_tag.text.strip()) if price_tag else None
 
             product_url_tag = product.find('a')
             product_url = product_url_tag['href'] if product_url_tag else 'N/A'
@@ -65,7 +95,8 @@ class GjirafaScraper:
 
         return products
 
-    def clean_price(self, price_str):
+    @staticmethod
+    def clean_price(price_str):
         """Clean the price string and convert it to a decimal value."""
         if price_str:
             # Remove currency symbols and commas
@@ -78,33 +109,26 @@ class GjirafaScraper:
         return None
 
 
-    def save_to_db(self, products, chunk_size=1000):
-        """Insert the scraped product data into the MySQL database in chunks."""
+    def save_to_db(self, products, chunk_size=1000, complete=True):
+        """
+        Insert the scraped product data into the MySQL database in chunks.
+
+        When complete is True (every page was scraped), products that were not part of
+        this save are deleted as delisted.
+        """
         if not self.db_connection:
             print("No database connection. Cannot save data.")
             return 0  # Return 0 if there's no connection
 
         cursor = self.db_connection.cursor()
 
-        cursor.execute('''CREATE TABLE IF NOT EXISTS gjirafa50_products (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            name VARCHAR(255),
-                            price DECIMAL(10, 2),  -- Now promo price
-                            promo_price DECIMAL(10, 2),  -- Now original price
-                            image_url VARCHAR(255),
-                            product_url VARCHAR(255),
-                            product_id VARCHAR(100)
-                        )''')
-        
-        cursor.execute('''TRUNCATE TABLE gjirafa50_products''')
-
-        insert_query = """
-        INSERT INTO gjirafa50_products (product_id, name, price, promo_price, image_url, product_url)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        name = VALUES(name), price = VALUES(price), promo_price = VALUES(promo_price),
-        image_url = VALUES(image_url), product_url = VALUES(product_url)
-        """
+        # Creates the table and its unique product_id key; rows are upserted by product_id
+        migrate(self.db_connection)
+
+        insert_query = upsert_products_sql('gjirafa50_products', ['product_id', 'name', 'price', 'promo_price',
+                                                                  'image_url', 'product_url'])
+        cursor.execute('SELECT NOW()')
+        (save_started_at,) = cursor.fetchone()
 
         count = 0 
 
@@ -121,6 +145,11 @@ class GjirafaScraper:
         if count % chunk_size != 0:
             self.db_connection.commit()
 
+        if complete:
+            removed = delete_unseen_products(cursor, 'gjirafa50_products', save_started_at)
+            self.db_connection.commit()
+            print(f"Removed {removed} delisted products.")
+
         cursor.execute('''CALL update_dim_gjirafa50_products_auto();''')
 
 
@@ -140,15 +169,25 @@ class GjirafaScraper:
         return []
 
     def scrape_all_pages(self):
-        """Scrape all available pages and save the data to the database."""
+        """
+        Scrape all available pages and save the data to the database.
+
+        Pages are fetched by I/O threads and parsed in a process pool (see run_pipeline).
+        """
         all_products = []
-        for page in range(1, self.total_pages + 1):
-            print(f"Scraping page {page}")
-            products = self.scrape_page(page)
+        failed_pages = []
+        pages = range(1, self.total_pages + 1)
+        for page, products, err in run_pipeline(pages, self.fetch_product_html, GjirafaScraper.parse_product_data,
+                                                io_workers=self.io_workers, parse_workers=self.parse_workers):
+            if err is not None:
+                print(f"Failed to scrape page {page}: {err}")
+                failed_pages.append(page)
+                continue
+            print(f"Scraped page {page}")
             all_products.extend(products)
 
         if all_products:
-            inserted_count = self.save_to_db(all_products)  
+            inserted_count = self.save_to_db(all_products, complete=not failed_pages)
             print(f"Inserted {inserted_count} products into the database.")  
 
 if __name__ == '__main__':
@@ -1,8 +1,14 @@
-import requests
 from bs4 import BeautifulSoup
 import mysql.connector
 import re  # Importing regex for extracting ID from the onclick attribute
 
+if __package__:
+    from .crawl import CrawlCheckpoint, fetch_with_retries, run_pipeline
+    from .schema import delete_unseen_products, migrate, upsert_products_sql
+else:  # Run as a script, e.g. python scraping/gjirafamall.py
+    from crawl import CrawlCheckpoint, fetch_with_retries, run_pipeline
+    from schema import delete_unseen_products, migrate, upsert_products_sql
+
 class Product:
     """
     A class to represent a product with its attributes.
@@ -26,23 +32,32 @@ class Scraper:
     """
     A class to scrape product data from a website and save it into a MySQL database.
     """
-    def __init__(self, base_url, num_pages, db_config):
+    def __init__(self, base_url, num_pages, db_config, io_workers=4, parse_workers=None):
         self.base_url = base_url
         self.num_pages = num_pages
         self.products = []
         self.db_config = db_config  # Database configuration
+        self.io_workers = io_workers  # Pages fetched concurrently
+        self.parse_workers = parse_workers  # Parse processes: None uses every core, 0 parses in-process
 
     def fetch_page(self, page_url):
-        """Fetches the HTML content of a given page URL."""
-        response = requests.get(page_url)
-        response.raise_for_status()  # Raise an error for bad responses
+        """Fetches the HTML content of a given page URL, retrying transient failures."""
+        response = fetch_with_retries(page_url)  # Raises once the retries are exhausted
         return response.text
 
-    def parse_product(self, product_html):
+    def fetch_listing(self, page):
+        """Fetches the HTML content of a numbered listing page."""
+        page_url = f"{self.base_url}?s=72&i={page}"
+        print(f"Scraping page: {page_url}")
+        return self.fetch_page(page_url)
+
+    @staticmethod
+    def parse_product(product_html):
         """
-        Extracts product details from the product HTML and returns a Product object.
+        Extracts product details from the product HTML (or its already parsed element)
+        and returns a Product object.
         """
-        soup = BeautifulSoup(product_html, 'html.parser')
+        soup = BeautifulSoup(product_html, 'html.parser') if isinstance(product_html, str) else product_html
 
         # Extract product details
         article_tag = soup.find('div', class_='art-name mt-2')
@@ -51,24 +66,24 @@ class Scraper:
         if article_tag and article_tag.find('a'):
             onclick_value = article_tag.find('a')['onclick']
             data_id_match = re.search(r"clickedObjectEvent\('(\d+)'\)", onclick_value)
-            data_id = data_id_match.group(1) if data_id_match else "N/A"
+            data_id = data_id_match.group(1) if data_id_match else None
         else:
-            data_id = "N/A"
+            data_id = None  # Stored as NULL so products without an id don't collide on the unique key
 
         # Extract product name
         name = article_tag.find('h2').get_text(strip=True) if article_tag else "N/A"
 
         # Extract and clean price values
         price = soup.find('span', class_='art-price art-price--offer')
-        price = self.extract_price(price) if price else None
+        price = Scraper.extract_price(price) if price else None
 
         # Extract old price
         old_price = soup.find('span', class_='art-oldprice')
-        old_price = self.extract_price(old_price) if old_price else None
+        old_price = Scraper.extract_price(old_price) if old_price else None
 
         # Extract promo price
         promo_price_element = soup.find('span', class_='mr-2 art-price art-price--offer')
-        promo_price = self.extract_price(promo_price_element) if promo_price_element else price
+        promo_price = Scraper.extract_price(promo_price_element) if promo_price_element else price
 
         # Extract product URL
         product_url = article_tag.find('a')['href'] if article_tag and article_tag.find('a') else "N/A"
@@ -80,7 +95,8 @@ class Scraper:
 
         return Product(name=name, price=price, old_price=old_price, promo_price=promo_price, product_url=product_url, image_url=image_url, data_id=data_id)
 
-    def extract_price(self, price_element):
+    @staticmethod
+    def extract_price(price_element):
         """
         Extracts and converts price from a BeautifulSoup element.
         """
@@ -98,49 +114,76 @@ class Scraper:
         return None
 
     def scrape(self):
-        """Scrapes the products from all pages and stores them in the products list."""
-        for page in range(1, self.num_pages + 1):
-            page_url = f"{self.base_url}?s=72&i={page}"
-            print(f"Scraping page: {page_url}")
-            page_html = self.fetch_page(page_url)
-            soup = BeautifulSoup(page_html, 'html.parser')
-
-            product_elements = soup.find_all('div', class_='art-data-block text-align-start')
-
-            for product_element in product_elements:
-                product_html = str(product_element)
-                product = self.parse_product(product_html)
-                self.products.append(product)
-
-    def save_to_mysql(self):
-        """Saves the scraped products to the MySQL database."""
+        """
+        Scrapes the products from all pages, saving each page to MySQL as it completes.
+
+        Pages are fetched by I/O threads and parsed in a process pool (see run_pipeline).
+
+        Every page is committed together with its checkpoint, so a restarted run only
+        fetches the missing pages while the interrupted run is recent (see CrawlCheckpoint),
+        and crawls everything again after that. Pages that still fail after retries are skipped and
+        left for the next run instead of aborting the crawl.
+        """
         conn = mysql.connector.connect(**self.db_config)
         cursor = conn.cursor()
+        migrate(conn)
+        checkpoint = CrawlCheckpoint(conn, 'gjirafamall')
+
+        completed_pages = checkpoint.begin()
+        if completed_pages:
+            print(f"Resuming crawl, {len(completed_pages)} pages already saved")
+
+        failed_pages = []
+        missing_pages = [page for page in range(1, self.num_pages + 1) if page not in completed_pages]
+        for page, rows, err in run_pipeline(missing_pages, self.fetch_listing, parse_page,
+                                            io_workers=self.io_workers, parse_workers=self.parse_workers):
+            if err is not None:
+                print(f"Giving up on page {page}: {err}")
+                failed_pages.append(page)
+                continue
+
+            products = [Product(*row) for row in rows]
+            self.insert_products(cursor, products)
+            checkpoint.mark_completed(cursor, page, len(products))
+            conn.commit()
+            self.products.extend(products)
+
+        if failed_pages:
+            print(f"Pages {failed_pages} failed, run the scraper again to resume")
+        else:
+            # Every page was saved, so products this run did not see have been delisted
+            removed = delete_unseen_products(cursor, 'gjirafamall_products', checkpoint.run_started_at)
+            conn.commit()
+            print(f"Removed {removed} delisted products")
+            # Commented out until procedure is confirmed
+            # cursor.callproc('calculate_price_history')
+            checkpoint.clear()
 
-        # Create the products table if it doesn't exist
-        cursor.execute('''CREATE TABLE IF NOT EXISTS gjirafamall_products (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            name VARCHAR(255),
-                            price DECIMAL(10, 2),
-                            promo_price DECIMAL(10, 2),
-                            image_url VARCHAR(255),
-                            product_url VARCHAR(255),
-                            product_id VARCHAR(100)
-                        )''')
+        cursor.close()
+        conn.close()
 
-        cursor.execute('''TRUNCATE TABLE gjirafamall_products''')
+    def insert_products(self, cursor, products):
+        """Inserts or updates products by product_id using the given cursor; the caller commits."""
+        cursor.executemany(upsert_products_sql('gjirafamall_products', ['name', 'price', 'promo_price', 'image_url',
+                                                            'product_url', 'product_id']),
+                           [(product.name, product.price, product.promo_price, product.image_url,
+                             product.product_url, product.data_id) for product in products])
 
-        for product in self.products:
-            cursor.execute('''INSERT INTO gjirafamall_products (name, price, promo_price, image_url, product_url, product_id)
-                            VALUES (%s, %s, %s, %s, %s, %s)''',
-                        (product.name, product.price, product.promo_price, product.image_url, product.product_url, product.data_id))
 
-        # Commented out until procedure is confirmed
-        # cursor.callproc('calculate_price_history')
+def parse_page(page_html):
+    """
+    Parses every product on a listing page into row tuples in Product argument order.
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+    Module-level so it can run in a parse worker process; only these plain tuples
+    are sent back, never soup or Product objects.
+    """
+    soup = BeautifulSoup(page_html, 'html.parser')
+    rows = []
+    for product_element in soup.find_all('div', class_='art-data-block text-align-start'):
+        product = Scraper.parse_product(product_element)
+        rows.append((product.name, product.price, product.old_price, product.promo_price,
+                     product.product_url, product.image_url, product.data_id))
+    return rows
 
 
 if __name__ == "__main__":
@@ -153,7 +196,5 @@ if __name__ == "__main__":
     }
 
     scraper = Scraper('https://gjirafamall.com/kozmetike-3', num_pages=307, db_config=db_config)  # Adjust num_pages if necessary
+    # Scraped products are saved to MySQL page by page; rerun to resume an interrupted crawl
     scraper.scrape()
-
-    # Save scraped products to MySQL database
-    scraper.save_to_mysql()
@@ -0,0 +1,385 @@
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+import mysql.connector
+from PIL import Image
+
+if __package__:
+    from .schema import RETAILER_TABLES, migrate
+else:  # Run as a script, e.g. python scraping/image_fingerprint.py
+    from schema import RETAILER_TABLES, migrate
+
+
+def dhash(image_path, hash_size=8):
+    """
+    Computes the difference hash (dHash) of an image file.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and
+    every bit records whether a pixel is brighter than its right neighbour, so the
+    hash survives re-encoding, resizing and small colour changes.
+
+    Args:
+        image_path (str): Path of the image file.
+        hash_size (int): Width and height of the bit grid (8 gives a 64-bit hash).
+
+    Returns:
+        int: The perceptual hash as an unsigned integer.
+    """
+    with Image.open(image_path) as image:
+        thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = thumbnail.tobytes()  # One byte per grayscale pixel
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hash_cached_image(image_path):
+    """Returns (image_path, dhash) so results can be matched up after leaving the process pool."""
+    try:
+        return image_path, dhash(image_path)
+    except (OSError, ValueError) as err:
+        print(f"Could not hash image {image_path}: {err}")
+        return image_path, None
+
+
+def hamming_distance(first, second):
+    """Returns the number of differing bits between two hashes."""
+    return bin(first ^ second).count('1')
+
+
+class BKTree:
+    """
+    A Burkhard-Keller tree over perceptual hashes using Hamming distance.
+
+    Lookups only descend into children whose edge distance lies within
+    [d - max_distance, d + max_distance], so a near-duplicate search touches a
+    small part of the tree instead of comparing against every stored hash.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, key):
+        """
+        Adds a hash to the tree.
+
+        Args:
+            value (int): The perceptual hash.
+            key (tuple): The (retailer, product_id) the hash belongs to.
+        """
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [key], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [key], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """
+        Finds every stored key whose hash is within max_distance of value.
+
+        Returns:
+            list: (distance, key) tuples sorted by distance.
+        """
+        if self.root is None:
+            return []
+
+        matches = []
+        candidates = [self.root]
+        while candidates:
+            node = candidates.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                matches.extend((distance, key) for key in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            candidates.extend(child for edge, child in node[2].items() if low <= edge <= high)
+
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class ImageCache:
+    """
+    A content-addressed store of downloaded images.
+
+    Files are named after the SHA-256 of their bytes, so the same picture served
+    under different URLs (or by different retailers) is stored only once.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, content_sha256):
+        """Returns the file path used for the given content digest."""
+        return os.path.join(self.cache_dir, content_sha256[:2], content_sha256)
+
+    def store(self, content):
+        """
+        Writes image bytes to the cache if they are not already present.
+
+        Returns:
+            str: The SHA-256 hex digest of the content.
+        """
+        content_sha256 = hashlib.sha256(content).hexdigest()
+        path = self.path_for(content_sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a truncated image behind
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        return content_sha256
+
+
+class FingerprintStore:
+    """
+    The image_fingerprints table, indexed by (retailer, product_id).
+
+    Each row records the image URL, the SHA-256 of its bytes and the dHash of the image,
+    so hashes can be looked up by URL or by content.
+    """
+
+    def __init__(self, db_connection):
+        """
+        Args:
+            db_connection: An open MySQL connection.
+        """
+        self.db_connection = db_connection
+        # Creates the image_fingerprints table (schema migration 7)
+        migrate(self.db_connection)
+
+    def known_hashes(self, image_urls):
+        """
+        Looks up image URLs that have already been hashed.
+
+        Returns:
+            dict: image_url -> (content_sha256, dhash).
+        """
+        known = {}
+        image_urls = list(image_urls)
+        cursor = self.db_connection.cursor()
+        for start in range(0, len(image_urls), 1000):
+            chunk = image_urls[start:start + 1000]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'''SELECT image_url, content_sha256, dhash FROM image_fingerprints
+                               WHERE image_url IN ({placeholders})''', chunk)
+            for image_url, content_sha256, image_hash in cursor.fetchall():
+                known[image_url] = (content_sha256, image_hash)
+        cursor.close()
+        return known
+
+    def known_contents(self, digests):
+        """Returns content_sha256 -> dhash for image contents hashed under some other URL."""
+        known = {}
+        digests = list(digests)
+        cursor = self.db_connection.cursor()
+        for start in range(0, len(digests), 1000):
+            chunk = digests[start:start + 1000]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'''SELECT DISTINCT content_sha256, dhash FROM image_fingerprints
+                               WHERE content_sha256 IN ({placeholders})''', chunk)
+            known.update(cursor.fetchall())
+        cursor.close()
+        return known
+
+    def save(self, rows):
+        """Upserts (retailer, product_id, image_url, content_sha256, dhash) rows."""
+        cursor = self.db_connection.cursor()
+        cursor.executemany('''INSERT INTO image_fingerprints (retailer, product_id, image_url, content_sha256, dhash)
+                              VALUES (%s, %s, %s, %s, %s)
+                              ON DUPLICATE KEY UPDATE
+                              image_url = VALUES(image_url), content_sha256 = VALUES(content_sha256),
+                              dhash = VALUES(dhash)''', rows)
+        self.db_connection.commit()
+        cursor.close()
+
+    def retailer_products(self, retailer):
+        """Returns (retailer, product_id, image_url) for every product in a retailer's scraped products table."""
+        cursor = self.db_connection.cursor()
+        cursor.execute(f'SELECT product_id, image_url FROM {RETAILER_TABLES[retailer]}')
+        products = [(retailer, product_id, image_url) for product_id, image_url in cursor.fetchall()]
+        cursor.close()
+        return products
+
+    def fingerprints(self):
+        """Returns every stored (retailer, product_id, dhash)."""
+        cursor = self.db_connection.cursor()
+        cursor.execute('SELECT retailer, product_id, dhash FROM image_fingerprints')
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+
+class ImageFingerprinter:
+    """
+    Downloads product images, computes perceptual hashes and finds identical
+    product photos across retailers.
+
+    Hashes are kept in a FingerprintStore. An image URL that already has a hash is
+    never downloaded again, an image whose bytes were already hashed under another
+    URL reuses that hash, and hashing runs in a process pool because it is CPU-bound.
+    """
+
+    def __init__(self, db_config=None, cache_dir='image_cache', workers=None, session=None, timeout=10,
+                 store=None):
+        """
+        Args:
+            db_config (dict): Database configuration for MySQL connection.
+            cache_dir (str): Directory of the content-addressed image cache.
+            workers (int or None): Size of the hashing process pool (defaults to the CPU count).
+            session (requests.Session or None): HTTP session used for downloads.
+            timeout (int): Download timeout in seconds.
+            store (FingerprintStore or None): Where hashes are kept, instead of connecting with db_config.
+        """
+        self.db_config = db_config
+        self.cache = ImageCache(cache_dir)
+        self.workers = workers
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.store = store
+        if self.store is None:
+            self.db_connection = self.connect_to_db()
+            if self.db_connection:
+                self.store = FingerprintStore(self.db_connection)
+            else:
+                print("No database connection. Fingerprints cannot be loaded or saved.")
+
+    def connect_to_db(self):
+        """Establish a connection to the MySQL database."""
+        try:
+            return mysql.connector.connect(**self.db_config)
+        except mysql.connector.Error as err:
+            print(f"Error: {err}")
+            return None
+
+    def download(self, image_url):
+        """
+        Downloads an image into the cache.
+
+        Returns:
+            str or None: The content digest, or None if the download failed.
+        """
+        try:
+            response = self.session.get(image_url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as err:
+            print(f"Failed to download image {image_url}: {err}")
+            return None
+        return self.cache.store(response.content)
+
+    def fingerprint(self, products):
+        """
+        Computes and stores hashes for the given products.
+
+        Args:
+            products (iterable): (retailer, product_id, image_url) tuples. Products without
+                a product_id or image are skipped.
+
+        Returns:
+            int: The number of fingerprint rows written.
+        """
+        if not self.store:
+            print("No database connection. Cannot fingerprint products.")
+            return 0
+
+        products = [p for p in products if p[1] and p[2] and p[2] != 'N/A']
+        urls = {image_url for _, _, image_url in products}
+        url_hashes = self.store.known_hashes(urls)
+
+        # Only URLs without a stored hash are downloaded; each URL is fetched once even if shared
+        url_digests = {}
+        for image_url in urls - url_hashes.keys():
+            content_sha256 = self.download(image_url)
+            if content_sha256:
+                url_digests[image_url] = content_sha256
+
+        content_hashes = self.store.known_contents(set(url_digests.values()))
+        pending = {digest for digest in url_digests.values() if digest not in content_hashes}
+
+        if pending:
+            paths = {self.cache.path_for(digest): digest for digest in pending}
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for path, image_hash in pool.map(hash_cached_image, paths, chunksize=32):
+                    if image_hash is not None:
+                        content_hashes[paths[path]] = image_hash
+
+        for image_url, content_sha256 in url_digests.items():
+            if content_sha256 in content_hashes:
+                url_hashes[image_url] = (content_sha256, content_hashes[content_sha256])
+
+        rows = [(retailer, product_id, image_url) + url_hashes[image_url]
+                for retailer, product_id, image_url in products if image_url in url_hashes]
+        self.store.save(rows)
+        return len(rows)
+
+    def fingerprint_retailer(self, retailer):
+        """Fingerprints every product of a retailer's scraped products table."""
+        if not self.store:
+            print("No database connection. Cannot fingerprint products.")
+            return 0
+        return self.fingerprint(self.store.retailer_products(retailer))
+
+    def load_index(self, fingerprints=None):
+        """Builds a BK-tree over the given (retailer, product_id, dhash) rows, every stored fingerprint by default."""
+        tree = BKTree()
+        for retailer, product_id, image_hash in (self.store.fingerprints() if fingerprints is None else fingerprints):
+            tree.add(image_hash, (retailer, product_id))
+        return tree
+
+    def find_near_duplicates(self, max_distance=4):
+        """
+        Finds pairs of products from different retailers with near-identical photos.
+
+        Returns:
+            list: ((retailer, product_id), (retailer, product_id), distance) tuples.
+        """
+        if not self.store:
+            print("No database connection. Cannot compare fingerprints.")
+            return []
+
+        fingerprints = self.store.fingerprints()
+        tree = self.load_index(fingerprints)
+        pairs = []
+        for retailer, product_id, image_hash in fingerprints:
+            for distance, (other_retailer, other_id) in tree.search(image_hash, max_distance):
+                # Report each cross-retailer pair once
+                if other_retailer != retailer and (retailer, product_id) < (other_retailer, other_id):
+                    pairs.append(((retailer, product_id), (other_retailer, other_id), distance))
+        return pairs
+
+
+if __name__ == "__main__":
+    # Database configuration
+    db_config = {
+        'host': 'localhost',
+        'user': 'root',
+        'password': '',
+        'database': 'scrape'
+    }
+
+    fingerprinter = ImageFingerprinter(db_config)
+    for retailer in RETAILER_TABLES:
+        print(f"Fingerprinted {fingerprinter.fingerprint_retailer(retailer)} {retailer} products")
+
+    for first, second, distance in fingerprinter.find_near_duplicates():
+        print(f"{first} ~ {second} (distance {distance})")
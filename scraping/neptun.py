@@ -2,6 +2,11 @@ import requests
 from bs4 import BeautifulSoup
 import mysql.connector
 
+if __package__:
+    from .schema import migrate
+else:  # Run as a script, e.g. python scraping/neptun.py
+    from schema import migrate
+
 class NeptunScraper:
     def __init__(self, base_url, db_config):
         self.base_url = base_url
@@ -69,13 +74,8 @@ class NeptunScraper:
             return
 
         cursor = self.db_connection.cursor()
-        cursor.execute('''CREATE TABLE IF NOT EXISTS neptun_products (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            name VARCHAR(255),
-                            price VARCHAR(50),
-                            product_url VARCHAR(255),
-                            image_url VARCHAR(255)
-                        )''')
+        # Creates the table and its unique product_url key that ON DUPLICATE KEY UPDATE relies on
+        migrate(self.db_connection)
 
         insert_query = """
         INSERT INTO neptun_products (name, price, product_url, image_url)
@@ -0,0 +1,325 @@
+import datetime
+
+# Raw products table of each retailer whose rows share the product_id/price/promo_price layout
+RETAILER_TABLES = {
+    'ebc': 'ebc_products',
+    'gjirafa50': 'gjirafa50_products',
+    'gjirafamall': 'gjirafamall_products',
+}
+
+# Versioned migrations for the scrape database. Each entry is (version, description, steps)
+# where a step is either a SQL string or a callable taking a cursor. Applied versions are
+# recorded in schema_migrations; never edit a released migration, append a new one instead.
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Registers the decorated function's returned steps as a schema migration."""
+    def register(func):
+        MIGRATIONS.append((version, description, func()))
+        return func
+    return register
+
+
+def month_start(day, months=0):
+    """Returns the first day of the month `months` after the month containing `day`."""
+    month_index = day.year * 12 + day.month - 1 + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_names(cursor, table):
+    """Returns the partition names of a table in definition order (empty if it is not partitioned)."""
+    cursor.execute('''SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+                      ORDER BY PARTITION_ORDINAL_POSITION''', (table,))
+    return [name for (name,) in cursor.fetchall()]
+
+
+def monthly_partitions(first_month, last_month):
+    """Builds partition clauses for every month from first_month to last_month inclusive."""
+    clauses = []
+    month = first_month
+    while month <= last_month:
+        upper = month_start(month, 1)
+        clauses.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{upper:%Y-%m-%d}')")
+        month = upper
+    return clauses
+
+
+def partition_by_month(cursor, table, column, months_ahead=3, today=None):
+    """
+    Range-partitions a table by month on a DATE/DATETIME column.
+
+    Partitions cover the oldest existing row up to months_ahead months from now, with a
+    catch-all p_future partition. MySQL requires the column to be part of every unique
+    key of the table. Does nothing if the table is already partitioned.
+    """
+    if partition_names(cursor, table):
+        return
+
+    cursor.execute(f'SELECT MIN({column}) FROM {table}')
+    (oldest,) = cursor.fetchone()
+    today = today or datetime.date.today()
+    first_month = month_start(oldest or today)
+    clauses = monthly_partitions(first_month, month_start(today, months_ahead))
+    clauses.append('PARTITION p_future VALUES LESS THAN (MAXVALUE)')
+    cursor.execute(f'ALTER TABLE {table} PARTITION BY RANGE COLUMNS({column}) ({", ".join(clauses)})')
+
+
+def ensure_monthly_partitions(cursor, table, months_ahead=3, today=None):
+    """
+    Splits new monthly partitions off p_future so that rows for the next months_ahead
+    months never land in the catch-all partition.
+
+    Run this regularly (e.g. after each scrape); while p_future is empty the split is a
+    metadata-only change.
+    """
+    names = [name for name in partition_names(cursor, table) if name != 'p_future']
+    if not names:
+        return
+
+    last_month = datetime.datetime.strptime(names[-1], 'p%Y%m').date()
+    clauses = monthly_partitions(month_start(last_month, 1), month_start(today or datetime.date.today(), months_ahead))
+    if clauses:
+        clauses.append('PARTITION p_future VALUES LESS THAN (MAXVALUE)')
+        cursor.execute(f'ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ({", ".join(clauses)})')
+
+
+def include_in_primary_key(cursor, table, column):
+    """Extends an (id) primary key to (id, column) so the table can be partitioned on column."""
+    cursor.execute('''SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = %s''',
+                   (table, 'PRIMARY'))
+    if column not in {name for (name,) in cursor.fetchall()}:
+        cursor.execute(f'ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column})')
+
+
+def add_index(cursor, table, index_name, columns):
+    """Adds an index unless one with the same name already exists."""
+    cursor.execute('''SELECT 1 FROM information_schema.STATISTICS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s''',
+                   (table, index_name))
+    if not cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {table} ADD INDEX {index_name} ({", ".join(columns)})')
+
+
+def add_unique_key(table, key_name, column):
+    """Returns steps that drop duplicate rows (keeping the newest) and add a unique key."""
+    return [
+        f'''DELETE older FROM {table} older
+            JOIN {table} newer ON older.{column} = newer.{column} AND older.id < newer.id''',
+        f'ALTER TABLE {table} ADD UNIQUE KEY {key_name} ({column})',
+    ]
+
+
+@migration(1, 'Create raw scraped products tables')
+def create_raw_tables():
+    steps = []
+    for table in RETAILER_TABLES.values():
+        steps.append(f'''CREATE TABLE IF NOT EXISTS {table} (
+                            id INT AUTO_INCREMENT PRIMARY KEY,
+                            name VARCHAR(255),
+                            price DECIMAL(10, 2),
+                            promo_price DECIMAL(10, 2),
+                            image_url VARCHAR(255),
+                            product_url VARCHAR(255),
+                            product_id VARCHAR(100)
+                        )''')
+    steps.append('''CREATE TABLE IF NOT EXISTS neptun_products (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        name VARCHAR(255),
+                        price VARCHAR(50),
+                        product_url VARCHAR(255),
+                        image_url VARCHAR(255)
+                    )''')
+    return steps
+
+
+@migration(2, 'Unique keys so ON DUPLICATE KEY UPDATE upserts by product')
+def add_unique_keys():
+    return (add_unique_key('ebc_products', 'uq_ebc_products_product_id', 'product_id')
+            + add_unique_key('gjirafamall_products', 'uq_gjirafamall_products_product_id', 'product_id')
+            + add_unique_key('gjirafa50_products', 'uq_gjirafa50_products_product_id', 'product_id')
+            # Neptun listings carry no product id, the product URL identifies the product
+            + add_unique_key('neptun_products', 'uq_neptun_products_product_url', 'product_url'))
+
+
+@migration(3, 'Month-partitioned dim_gjirafa50_products history with lookup index')
+def create_gjirafa50_history():
+    return [
+        # valid_from is part of the primary key because MySQL requires the partitioning
+        # column in every unique key
+        '''CREATE TABLE IF NOT EXISTS dim_gjirafa50_products (
+               id INT AUTO_INCREMENT,
+               product_id VARCHAR(100),
+               name VARCHAR(255),
+               price DECIMAL(10, 2),
+               promo_price DECIMAL(10, 2),
+               image_url VARCHAR(255),
+               product_url VARCHAR(255),
+               valid_from DATE NOT NULL,
+               valid_to DATE,
+               PRIMARY KEY (id, valid_from),
+               KEY ix_dim_gjirafa50_products_product_valid_to (product_id, valid_to)
+           )''',
+        # The table may predate this migration with a plain (id) key and no index
+        lambda cursor: include_in_primary_key(cursor, 'dim_gjirafa50_products', 'valid_from'),
+        lambda cursor: add_index(cursor, 'dim_gjirafa50_products', 'ix_dim_gjirafa50_products_product_valid_to',
+                                 ['product_id', 'valid_to']),
+        lambda cursor: partition_by_month(cursor, 'dim_gjirafa50_products', 'valid_from'),
+    ]
+
+
+@migration(4, 'Track when raw products rows were created or last changed')
+def add_updated_at():
+    steps = []
+    for table in list(RETAILER_TABLES.values()) + ['neptun_products']:
+        # ON UPDATE only fires when an upsert actually changes a value, so updated_at
+        # marks real changes and drives incremental exports
+        steps.append(f'''ALTER TABLE {table}
+                           ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                           ADD INDEX ix_{table}_updated_at (updated_at)''')
+    return steps
+
+
+@migration(5, 'Track when raw products were last seen by a crawl, NULL for missing product ids')
+def add_last_seen():
+    steps = []
+    for table in RETAILER_TABLES.values():
+        steps.append(f'''ALTER TABLE {table}
+                           ADD COLUMN last_seen TIMESTAMP NULL,
+                           ADD INDEX ix_{table}_last_seen (last_seen)''')
+    # 'N/A' fallbacks collapsed every product without an id into one row under the unique key
+    for table in ('gjirafa50_products', 'gjirafamall_products'):
+        steps.append(f"UPDATE {table} SET product_id = NULL WHERE product_id = 'N/A'")
+    return steps
+
+
+@migration(6, 'Track the pages completed by each crawl run')
+def create_crawl_checkpoints():
+    return [
+        '''CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+               crawl_name VARCHAR(100) NOT NULL,
+               page INT NOT NULL,
+               row_count INT NOT NULL,
+               run_started_at DATETIME NOT NULL,
+               completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (crawl_name, page)
+           )''',
+    ]
+
+
+@migration(7, 'Perceptual hashes of product images')
+def create_image_fingerprints():
+    return [
+        '''CREATE TABLE IF NOT EXISTS image_fingerprints (
+               id INT AUTO_INCREMENT PRIMARY KEY,
+               retailer VARCHAR(50) NOT NULL,
+               product_id VARCHAR(100) NOT NULL,
+               image_url VARCHAR(255) NOT NULL,
+               content_sha256 CHAR(64) NOT NULL,
+               dhash BIGINT UNSIGNED NOT NULL,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+               UNIQUE KEY uq_image_fingerprints_product (retailer, product_id),
+               KEY ix_image_fingerprints_image_url (image_url),
+               KEY ix_image_fingerprints_content (content_sha256)
+           )''',
+    ]
+
+
+def upsert_products_sql(table, columns):
+    """
+    Builds the INSERT ... ON DUPLICATE KEY UPDATE statement for a raw products table.
+
+    Every upserted row gets last_seen = NOW(), so products missing from a completed
+    crawl can be removed with delete_unseen_products. updated_at is assigned first and
+    explicitly, because touching last_seen would otherwise trigger its ON UPDATE: it only
+    moves when one of the scraped values actually changed.
+
+    Args:
+        table (str): The raw products table.
+        columns (list): Inserted columns in parameter order, including product_id.
+    """
+    values = [column for column in columns if column != 'product_id']
+    unchanged = ' AND '.join(f'{column} <=> VALUES({column})' for column in values)
+    assignments = ', '.join(f'{column} = VALUES({column})' for column in values)
+    return (f"INSERT INTO {table} ({', '.join(columns)}, last_seen) "
+            f"VALUES ({', '.join(['%s'] * len(columns))}, NOW()) "
+            f"ON DUPLICATE KEY UPDATE updated_at = IF({unchanged}, updated_at, CURRENT_TIMESTAMP), "
+            f"{assignments}, last_seen = VALUES(last_seen)")
+
+
+def delete_unseen_products(cursor, table, crawl_started_at):
+    """
+    Deletes products that a completed crawl did not see, i.e. delisted products.
+
+    Only call this after every page of the crawl was saved, otherwise products on the
+    failed pages would be deleted too.
+
+    Returns:
+        int: The number of deleted rows.
+    """
+    cursor.execute(f'DELETE FROM {table} WHERE last_seen < %s OR last_seen IS NULL', (crawl_started_at,))
+    return cursor.rowcount
+
+
+# Tables kept partitioned ahead of time by migrate()
+PARTITIONED_TABLES = ['dim_gjirafa50_products']
+
+
+def migrate(db_connection):
+    """
+    Applies pending migrations to the scrape database and rolls partitions forward.
+
+    Args:
+        db_connection: An open MySQL connection.
+
+    Returns:
+        list: Versions applied by this call.
+    """
+    cursor = db_connection.cursor()
+    cursor.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INT PRIMARY KEY,
+                        description VARCHAR(255),
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+    cursor.execute('SELECT version FROM schema_migrations')
+    applied_versions = {version for (version,) in cursor.fetchall()}
+
+    applied = []
+    for version, description, steps in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied_versions:
+            continue
+        print(f"Applying schema migration {version}: {description}")
+        for step in steps:
+            if callable(step):
+                step(cursor)
+            else:
+                cursor.execute(step)
+        # MySQL DDL commits implicitly, so each migration is recorded right after it runs
+        cursor.execute('INSERT INTO schema_migrations (version, description) VALUES (%s, %s)',
+                       (version, description))
+        db_connection.commit()
+        applied.append(version)
+
+    for table in PARTITIONED_TABLES:
+        ensure_monthly_partitions(cursor, table)
+    db_connection.commit()
+    cursor.close()
+    return applied
+
+
+if __name__ == "__main__":
+    import mysql.connector
+
+    # Database configuration
+    db_config = {
+        'host': 'localhost',
+        'user': 'root',
+        'password': '',
+        'database': 'scrape'
+    }
+
+    conn = mysql.connector.connect(**db_config)
+    print(f"Applied migrations: {migrate(conn) or 'none'}")
+    conn.close()
@@ -0,0 +1,73 @@
+import http.server
+import threading
+
+import django
+import pytest
+from django.conf import settings
+
+# The repo ships no settings module, so the Django tests run against an in-memory SQLite
+# database with just the apps the products app needs
+if not settings.configured:
+    settings.configure(
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        INSTALLED_APPS=[
+            'django.contrib.admin',
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'rest_framework',
+            'products',
+        ],
+        MIDDLEWARE=[
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        ],
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'APP_DIRS': True,
+            'OPTIONS': {'context_processors': ['django.contrib.auth.context_processors.auth',
+                                               'django.contrib.messages.context_processors.messages',
+                                               'django.template.context_processors.request']},
+        }],
+        ROOT_URLCONF='api.urls',
+        USE_TZ=True,
+        SECRET_KEY='tests',
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        DEFAULT_AUTO_FIELD='django.db.models.AutoField',
+    )
+    django.setup()
+
+
+@pytest.fixture
+def http_server():
+    """Starts a local HTTP server for a handler class and returns its base URL; stopped after the test."""
+    servers = []
+
+    def start(handler_class):
+        httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f'http://127.0.0.1:{httpd.server_port}'
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture(scope='session')
+def django_schema():
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+@pytest.fixture
+def db(django_schema):
+    """Runs the test in a transaction that is rolled back afterwards."""
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
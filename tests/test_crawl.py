@@ -0,0 +1,189 @@
+import datetime
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+from scraping.crawl import CrawlCheckpoint, fetch_with_retries, is_resumable, run_pipeline
+
+
+class FlakyHandler(http.server.BaseHTTPRequestHandler):
+    """Answers /flaky with 502 twice before succeeding and /missing with 404."""
+
+    attempts = 0
+
+    def do_GET(self):
+        if self.path == '/flaky':
+            FlakyHandler.attempts += 1
+            status = 502 if FlakyHandler.attempts <= 2 else 200
+        else:
+            status = 404
+        self.send_response(status)
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(http_server):
+    FlakyHandler.attempts = 0
+    return http_server(FlakyHandler)
+
+
+def test_fetch_with_retries_retries_transient_errors(server):
+    response = fetch_with_retries(f'{server}/flaky', backoff=0)
+    assert response.text == 'ok'
+    assert FlakyHandler.attempts == 3
+
+
+def test_fetch_with_retries_gives_up_after_last_retry(server):
+    with pytest.raises(requests.HTTPError):
+        fetch_with_retries(f'{server}/flaky', retries=1, backoff=0)
+    assert FlakyHandler.attempts == 2
+
+
+def test_fetch_with_retries_does_not_retry_client_errors(server):
+    with pytest.raises(requests.HTTPError):
+        fetch_with_retries(f'{server}/missing', backoff=0)
+
+
+def test_is_resumable():
+    now = datetime.datetime(2026, 10, 19, 12, 0)
+    max_age = datetime.timedelta(hours=12)
+    assert is_resumable(now - datetime.timedelta(hours=1), now, max_age)
+    assert is_resumable(now - max_age, now, max_age)
+    assert not is_resumable(now - datetime.timedelta(hours=13), now, max_age)
+    assert not is_resumable(None, now, max_age)
+
+
+class FakeCursor:
+    """Answers the checkpoint queries from a list of (page, run_started_at) rows."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = []
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        rows = self.connection.rows
+        if sql.startswith('SELECT NOW()'):
+            self.result = [(self.connection.now,)]
+        elif sql.startswith('SELECT MIN(run_started_at)'):
+            self.result = [(min((started for _, started in rows if started), default=None),)]
+        elif sql.startswith('SELECT page'):
+            self.result = [(page,) for page, started in rows if started == params[1]]
+        elif sql.startswith('DELETE'):
+            rows.clear()
+        elif sql.startswith('INSERT'):
+            rows.append((params[1], params[3]))
+        else:
+            self.result = []
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, now, rows):
+        self.now = now
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+
+def test_checkpoint_resumes_recent_run():
+    now = datetime.datetime(2026, 10, 19, 12, 0)
+    started = now - datetime.timedelta(hours=2)
+    checkpoint = CrawlCheckpoint(FakeConnection(now, [(1, started), (2, started)]), 'ebc')
+    assert checkpoint.begin() == {1, 2}
+    assert checkpoint.run_started_at == started
+
+
+def test_checkpoint_discards_stale_run():
+    now = datetime.datetime(2026, 10, 19, 12, 0)
+    connection = FakeConnection(now, [(1, now - datetime.timedelta(days=3)), (2, None)])
+    checkpoint = CrawlCheckpoint(connection, 'ebc')
+    assert checkpoint.begin() == set()
+    assert checkpoint.run_started_at == now
+    assert connection.rows == []
+
+    checkpoint.mark_completed(connection.cursor(), 5, 72)
+    assert connection.rows == [(5, now)]
+
+
+def parse_length(body):
+    return [(body, len(body))]
+
+
+@pytest.mark.parametrize('parse_workers', [0, 2])
+def test_run_pipeline_yields_every_page(parse_workers):
+    def fetch(page):
+        if page == 3:
+            raise requests.ConnectionError('refused')
+        return 'x' * page
+
+    results = sorted(run_pipeline(range(1, 11), fetch, parse_length, io_workers=2, parse_workers=parse_workers),
+                     key=lambda result: result[0])
+    assert [page for page, _, _ in results] == list(range(1, 11))
+    assert results[0] == (1, [('x', 1)], None)
+    assert results[2][1] is None and isinstance(results[2][2], requests.ConnectionError)
+
+
+def test_run_pipeline_limits_pages_in_flight():
+    lock = threading.Lock()
+    state = {'fetched': 0, 'consumed': 0, 'max_unconsumed': 0}
+
+    def fetch(page):
+        with lock:
+            state['fetched'] += 1
+            state['max_unconsumed'] = max(state['max_unconsumed'], state['fetched'] - state['consumed'])
+        return str(page)
+
+    for _ in run_pipeline(range(100), fetch, parse_length, io_workers=2, parse_workers=0):
+        with lock:
+            state['consumed'] += 1
+
+    assert state['fetched'] == 100
+    assert state['max_unconsumed'] <= 4
+
+
+def parse_slowly(body):
+    started = time.time()
+    time.sleep(1)
+    return [(started, time.time())]
+
+
+def test_run_pipeline_keeps_every_parse_worker_busy():
+    spans = [rows[0] for _, rows, _ in run_pipeline(range(12), str, parse_slowly, io_workers=1, parse_workers=6)]
+
+    # Parses running at the moment each one started
+    concurrency = max(sum(start <= begin < end for start, end in spans) for begin, _ in spans)
+    assert concurrency > 2  # More than io_workers * 2
+
+
+def test_run_pipeline_cancels_fetches_when_consumer_raises():
+    fetched = []
+
+    def fetch(page):
+        fetched.append(page)
+        return str(page)
+
+    with pytest.raises(RuntimeError):
+        for _ in run_pipeline(range(40), fetch, parse_length, io_workers=2, parse_workers=0):
+            raise RuntimeError('database error')
+
+    assert len(fetched) <= 4
@@ -0,0 +1,96 @@
+import csv
+import datetime
+import decimal
+import gzip
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.export import Export, stream_csv_gz, stream_parquet
+from products.models import ExportWatermark, PriceHistory, Product
+
+COLUMNS = [('id', 'int'), ('name', 'str'), ('price', 'price'), ('is_valid', 'bool'), ('created_at', 'datetime')]
+CREATED = datetime.datetime(2026, 10, 19, 8, 30, tzinfo=datetime.timezone.utc)
+CHUNKS = [
+    [(1, 'Laptop', decimal.Decimal('899.99'), True, CREATED)],
+    [(2, 'Mouse, wireless', decimal.Decimal('19.50'), False, CREATED), (3, None, None, True, None)],
+]
+
+
+def test_stream_csv_gz_round_trip():
+    data = b''.join(stream_csv_gz(COLUMNS, iter(CHUNKS)))
+    rows = list(csv.reader(io.StringIO(gzip.decompress(data).decode('utf-8'))))
+    assert rows == [
+        ['id', 'name', 'price', 'is_valid', 'created_at'],
+        ['1', 'Laptop', '899.99', 'True', '2026-10-19 08:30:00+00:00'],
+        ['2', 'Mouse, wireless', '19.50', 'False', '2026-10-19 08:30:00+00:00'],
+        ['3', '', '', 'True', ''],
+    ]
+
+
+def test_stream_parquet_writes_a_row_group_per_chunk():
+    pq = pytest.importorskip('pyarrow.parquet')  # Parquet export is optional
+    data = b''.join(stream_parquet(COLUMNS, iter(CHUNKS)))
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column_names == ['id', 'name', 'price', 'is_valid', 'created_at']
+    assert table.to_pylist()[1] == {'id': 2, 'name': 'Mouse, wireless', 'price': decimal.Decimal('19.50'),
+                                    'is_valid': False, 'created_at': CREATED}
+
+
+def test_incremental_export_rejects_date_bounds():
+    with pytest.raises(ValueError):
+        Export(incremental=True, start=CREATED)
+    with pytest.raises(ValueError):
+        Export(incremental=True, end=CREATED)
+
+
+def test_incremental_export_advances_watermark(db):
+    product = Product.objects.create(product_name='Laptop', product_id='42', price=899,
+                                     product_url='https://gjirafa50.com/laptop', image_url='https://gjirafa50.com/l.jpg')
+    history = PriceHistory.objects.create(product=product, price=899)
+    PriceHistory.objects.filter(pk=history.pk).update(updated_at=timezone.now() - datetime.timedelta(minutes=10))
+
+    export = Export(incremental=True)
+    rows = gzip.decompress(b''.join(export)).decode('utf-8').splitlines()
+    assert len(rows) == 2
+    assert ExportWatermark.objects.get(name='price_history:all').exported_until == export.changed_until
+
+    rows = gzip.decompress(b''.join(Export(incremental=True))).decode('utf-8').splitlines()
+    assert len(rows) == 1  # Only the header, nothing changed since
+
+
+def test_app_routes_are_mounted_under_api():
+    assert resolve('/api/export/').url_name == 'export'
+    assert resolve('/api/watches/').url_name == 'price-watch-list-create'
+    assert resolve('/api/products/1/').url_name == 'product-detail'
+
+
+def test_incremental_export_leaves_recent_changes_for_next_export(db):
+    product = Product.objects.create(product_name='Laptop', product_id='42', price=899,
+                                     product_url='https://gjirafa50.com/laptop', image_url='https://gjirafa50.com/l.jpg')
+    PriceHistory.objects.create(product=product, price=899)
+
+    export = Export(incremental=True)
+    rows = gzip.decompress(b''.join(export)).decode('utf-8').splitlines()
+    assert len(rows) == 1
+    assert export.changed_until <= timezone.now() - datetime.timedelta(minutes=4)
+
+
+def test_export_view_is_limited_to_staff(db):
+    client = APIClient()
+    assert client.get('/api/export/').status_code in (401, 403)
+
+    client.force_authenticate(User.objects.create(username='ana'))
+    assert client.get('/api/export/').status_code == 403
+
+    client.force_authenticate(User.objects.create(username='analyst', is_staff=True))
+    response = client.get('/api/export/', {'changed_since': '2026-10-01'})
+    assert response.status_code == 200
+    assert 'X-Export-Until' in response
+    assert gzip.decompress(b''.join(response.streaming_content)).startswith(b'id,product_id')
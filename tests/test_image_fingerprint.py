@@ -0,0 +1,133 @@
+import collections
+import http.server
+import io
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from scraping import image_fingerprint
+from scraping.image_fingerprint import BKTree, ImageFingerprinter, dhash, hamming_distance
+
+
+def render(shape):
+    """Renders a small PNG with a dark shape on a light background."""
+    image = Image.new('RGB', (64, 64), 'white')
+    draw = ImageDraw.Draw(image)
+    if shape == 'square':
+        draw.rectangle((8, 8, 40, 40), fill='black')
+    else:
+        draw.ellipse((20, 4, 60, 60), fill='navy')
+    data = io.BytesIO()
+    image.save(data, format='PNG')
+    return data.getvalue()
+
+
+IMAGES = {'/square.png': render('square'), '/square-copy.png': render('square'), '/circle.png': render('circle')}
+
+
+class ImageHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the fixture images and counts the requests per path."""
+
+    requests = collections.Counter()
+
+    def do_GET(self):
+        ImageHandler.requests[self.path] += 1
+        body = IMAGES.get(self.path)
+        self.send_response(200 if body else 404)
+        self.end_headers()
+        self.wfile.write(body or b'')
+
+    def log_message(self, *args):
+        pass
+
+
+class MemoryFingerprintStore:
+    """Keeps fingerprints in a dict with the FingerprintStore interface."""
+
+    def __init__(self):
+        self.rows = {}  # (retailer, product_id) -> (image_url, content_sha256, dhash)
+
+    def known_hashes(self, image_urls):
+        return {url: (digest, value) for url, digest, value in self.rows.values() if url in set(image_urls)}
+
+    def known_contents(self, digests):
+        return {digest: value for _, digest, value in self.rows.values() if digest in set(digests)}
+
+    def save(self, rows):
+        for retailer, product_id, image_url, content_sha256, value in rows:
+            self.rows[(retailer, product_id)] = (image_url, content_sha256, value)
+
+    def fingerprints(self):
+        return [key + (value,) for key, (_, _, value) in self.rows.items()]
+
+
+@pytest.fixture
+def server(http_server):
+    ImageHandler.requests.clear()
+    return http_server(ImageHandler)
+
+
+@pytest.fixture
+def fingerprinter(tmp_path):
+    return ImageFingerprinter(cache_dir=str(tmp_path), workers=1, store=MemoryFingerprintStore())
+
+
+def test_hashed_urls_are_not_downloaded_again(server, fingerprinter):
+    products = [('ebc', '1', f'{server}/square.png'), ('gjirafa50', '7', f'{server}/square.png'),
+                ('ebc', '2', f'{server}/circle.png'), ('ebc', None, f'{server}/circle.png'),
+                ('ebc', '3', f'{server}/missing.png')]
+    assert fingerprinter.fingerprint(products) == 3
+    assert ImageHandler.requests == {'/square.png': 1, '/circle.png': 1, '/missing.png': 1}
+
+    assert fingerprinter.fingerprint(products[:3]) == 3
+    assert ImageHandler.requests == {'/square.png': 1, '/circle.png': 1, '/missing.png': 1}
+
+
+def test_identical_bytes_under_a_new_url_reuse_the_hash(server, fingerprinter, monkeypatch):
+    fingerprinter.fingerprint([('ebc', '1', f'{server}/square.png')])
+
+    def no_hashing(*args, **kwargs):
+        raise AssertionError('known content was hashed again')
+
+    monkeypatch.setattr(image_fingerprint, 'ProcessPoolExecutor', no_hashing)
+    assert fingerprinter.fingerprint([('gjirafamall', '9', f'{server}/square-copy.png')]) == 1
+    rows = fingerprinter.store.rows
+    assert rows[('gjirafamall', '9')][1:] == rows[('ebc', '1')][1:]
+    assert fingerprinter.find_near_duplicates(max_distance=0) == [(('ebc', '1'), ('gjirafamall', '9'), 0)]
+
+
+def test_dhash_tells_images_apart(tmp_path):
+    paths = []
+    for name, data in [('square', IMAGES['/square.png']), ('circle', IMAGES['/circle.png'])]:
+        path = tmp_path / f'{name}.png'
+        path.write_bytes(data)
+        paths.append(str(path))
+    assert hamming_distance(dhash(paths[0]), dhash(paths[1])) > 4
+
+
+def test_bktree_search_matches_brute_force():
+    rng = random.Random(26)
+    base = [rng.getrandbits(64) for _ in range(20)]
+    # Clusters of near-identical hashes, as produced by re-encoded copies of a photo
+    hashes = [value ^ sum(1 << rng.randrange(64) for _ in range(rng.randint(0, 3)))
+              for value in base for _ in range(10)]
+
+    tree = BKTree()
+    for key, value in enumerate(hashes):
+        tree.add(value, key)
+    assert tree.size == len(hashes)
+
+    for query in base + [rng.getrandbits(64) for _ in range(20)]:
+        for max_distance in (0, 2, 8):
+            expected = sorted((hamming_distance(query, value), key) for key, value in enumerate(hashes)
+                              if hamming_distance(query, value) <= max_distance)
+            assert sorted(tree.search(query, max_distance)) == expected
+
+
+def test_fingerprinter_without_database_does_nothing(tmp_path):
+    fingerprinter = ImageFingerprinter({'host': '127.0.0.1', 'port': 1, 'user': 'root', 'password': '',
+                                        'database': 'scrape', 'connection_timeout': 1}, cache_dir=str(tmp_path))
+    assert fingerprinter.store is None
+    assert fingerprinter.fingerprint([('ebc', '1', 'http://127.0.0.1:1/square.png')]) == 0
+    assert fingerprinter.find_near_duplicates() == []
@@ -0,0 +1,98 @@
+import datetime
+
+from scraping.schema import (MIGRATIONS, delete_unseen_products, ensure_monthly_partitions, month_start,
+                             monthly_partitions, partition_by_month, upsert_products_sql)
+
+
+class FakeCursor:
+    """Records executed statements and answers queries from a list of canned results."""
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.statements = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+    def fetchone(self):
+        return self.results.pop(0)[0]
+
+
+def test_month_start():
+    assert month_start(datetime.date(2026, 10, 19)) == datetime.date(2026, 10, 1)
+    assert month_start(datetime.date(2026, 10, 19), 3) == datetime.date(2027, 1, 1)
+    assert month_start(datetime.date(2026, 1, 31), -1) == datetime.date(2025, 12, 1)
+    assert month_start(datetime.datetime(2026, 12, 31, 23, 59), 1) == datetime.date(2027, 1, 1)
+
+
+def test_monthly_partitions_cover_months_inclusive():
+    assert monthly_partitions(datetime.date(2026, 11, 1), datetime.date(2027, 1, 1)) == [
+        "PARTITION p202611 VALUES LESS THAN ('2026-12-01')",
+        "PARTITION p202612 VALUES LESS THAN ('2027-01-01')",
+        "PARTITION p202701 VALUES LESS THAN ('2027-02-01')",
+    ]
+    assert monthly_partitions(datetime.date(2027, 1, 1), datetime.date(2026, 12, 1)) == []
+
+
+def test_partition_by_month_starts_at_oldest_row():
+    cursor = FakeCursor([[], [(datetime.date(2026, 8, 14),)]])
+    partition_by_month(cursor, 'history', 'valid_from', months_ahead=1, today=datetime.date(2026, 10, 19))
+
+    sql, _ = cursor.statements[-1]
+    assert sql.startswith('ALTER TABLE history PARTITION BY RANGE COLUMNS(valid_from)')
+    assert [name for name in ('p202607', 'p202608', 'p202609', 'p202610', 'p202611', 'p202612')
+            if f'PARTITION {name} ' in sql] == ['p202608', 'p202609', 'p202610', 'p202611']
+    assert sql.endswith("PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+
+
+def test_partition_by_month_skips_partitioned_table():
+    cursor = FakeCursor([[('p202610',), ('p_future',)]])
+    partition_by_month(cursor, 'history', 'valid_from', today=datetime.date(2026, 10, 19))
+    assert len(cursor.statements) == 1
+
+
+def test_ensure_monthly_partitions_splits_p_future():
+    cursor = FakeCursor([[('p202609',), ('p202610',), ('p_future',)]])
+    ensure_monthly_partitions(cursor, 'history', months_ahead=2, today=datetime.date(2026, 10, 19))
+
+    sql, _ = cursor.statements[-1]
+    assert sql == ("ALTER TABLE history REORGANIZE PARTITION p_future INTO ("
+                   "PARTITION p202611 VALUES LESS THAN ('2026-12-01'), "
+                   "PARTITION p202612 VALUES LESS THAN ('2027-01-01'), "
+                   "PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+
+
+def test_ensure_monthly_partitions_is_noop_when_ahead():
+    cursor = FakeCursor([[('p202612',), ('p_future',)]])
+    ensure_monthly_partitions(cursor, 'history', months_ahead=2, today=datetime.date(2026, 10, 19))
+    assert len(cursor.statements) == 1
+
+
+def test_upsert_products_sql_only_moves_updated_at_on_change():
+    sql = upsert_products_sql('ebc_products', ['name', 'price', 'product_id'])
+    assert sql.startswith('INSERT INTO ebc_products (name, price, product_id, last_seen) VALUES (%s, %s, %s, NOW())')
+    # updated_at must be assigned before the columns it compares against
+    assert sql.index('updated_at = IF(name <=> VALUES(name) AND price <=> VALUES(price), updated_at,') \
+        < sql.index('name = VALUES(name)')
+    assert 'product_id = VALUES' not in sql
+    assert sql.endswith('last_seen = VALUES(last_seen)')
+
+
+def test_delete_unseen_products():
+    cursor = FakeCursor()
+    cursor.rowcount = 3
+    started = datetime.datetime(2026, 10, 19, 6, 0)
+    assert delete_unseen_products(cursor, 'ebc_products', started) == 3
+    assert cursor.statements == [('DELETE FROM ebc_products WHERE last_seen < %s OR last_seen IS NULL', (started,))]
+
+
+def test_migration_versions_are_unique():
+    versions = [version for version, _, _ in MIGRATIONS]
+    assert len(versions) == len(set(versions))
+    statements = [step for _, _, steps in MIGRATIONS for step in steps if isinstance(step, str)]
+    assert any('CREATE TABLE IF NOT EXISTS crawl_checkpoints' in step for step in statements)
+    assert any('CREATE TABLE IF NOT EXISTS image_fingerprints' in step and 'dhash' in step for step in statements)
@@ -0,0 +1,148 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.models import PriceWatch, Product, WatchEvaluationCursor
+from products.watch import CURSOR_NAME, MemorySink, NotificationSink, WatchIndex, evaluate_changed_products
+
+
+def watch(pk, max_price=None, notify_on_discount=False, last_notified_price=None, last_seen_discount=None):
+    return PriceWatch(pk=pk, email=f'user{pk}@example.com', product_id='42', max_price=max_price,
+                      notify_on_discount=notify_on_discount, last_notified_price=last_notified_price,
+                      last_seen_discount=last_seen_discount)
+
+
+def product(price, discount=None):
+    return Product(product_id='42', product_name='Laptop', price=Decimal(price),
+                   discount=Decimal(discount) if discount else None)
+
+
+def triggered(notifications):
+    return sorted((n.watch.pk, n.reason) for n in notifications)
+
+
+def test_watch_index_triggers_thresholds_at_or_above_price():
+    index = WatchIndex([watch(1, Decimal('500')), watch(2, Decimal('450')), watch(3, Decimal('400')),
+                        watch(4, Decimal('450'))])
+    assert triggered(index.evaluate(product('450'))) == [(1, 'price'), (2, 'price'), (4, 'price')]
+    assert triggered(index.evaluate(product('399.99'))) == [(1, 'price'), (2, 'price'), (3, 'price'),
+                                                            (4, 'price')]
+    assert index.evaluate(product('600')) == []
+
+
+def test_watch_index_waits_for_a_lower_price():
+    index = WatchIndex([watch(1, Decimal('500'), last_notified_price=Decimal('450'))])
+    assert index.evaluate(product('450')) == []
+    assert triggered(index.evaluate(product('449'))) == [(1, 'price')]
+    assert not index.changed
+
+
+def test_watch_index_rearms_when_price_rises_above_max_price():
+    notified = watch(1, Decimal('500'), last_notified_price=Decimal('450'))
+    index = WatchIndex([notified])
+    assert index.evaluate(product('520')) == []
+    assert notified.last_notified_price is None
+    assert index.changed == {1: notified}
+    assert triggered(index.evaluate(product('480'))) == [(1, 'price')]
+
+
+def test_watch_index_notifies_only_gained_discounts():
+    discounted = watch(1, notify_on_discount=True, last_seen_discount=Decimal('10'))
+    index = WatchIndex([discounted, watch(2, notify_on_discount=True)])
+    assert triggered(index.evaluate(product('450', '10'))) == [(2, 'discount')]
+    assert index.changed == {}  # Watch 1 saw no change, watch 2 is saved on delivery
+
+    assert index.evaluate(product('450')) == []
+    assert discounted.last_seen_discount is None
+    assert triggered(index.evaluate(product('400', '20'))) == [(1, 'discount'), (2, 'discount')]
+
+
+def test_notification_sink_is_abstract():
+    with pytest.raises(TypeError):
+        NotificationSink()
+
+
+def make_product(price, discount=None, minutes_ago=10):
+    item = Product.objects.create(product_id='42', product_name='Laptop', price=Decimal(price),
+                                  discount=discount, product_url='https://ebc.shop/laptop',
+                                  image_url='https://ebc.shop/laptop.jpg')
+    Product.objects.filter(pk=item.pk).update(updated_at=timezone.now() - datetime.timedelta(minutes=minutes_ago))
+    return item
+
+
+def test_evaluate_changed_products_delivers_batches_and_records_state(db):
+    make_product('400', discount=Decimal('20'))
+    for pk in range(1, 4):
+        PriceWatch.objects.create(pk=pk, email=f'user{pk}@example.com', product_id='42', max_price=Decimal('450'))
+    PriceWatch.objects.create(pk=4, email='user4@example.com', product_id='42', notify_on_discount=True)
+
+    sink = MemorySink()
+    assert evaluate_changed_products(sink, batch_size=3) == 4
+    assert [len(batch) for batch in sink.batches] == [3, 1]
+    assert PriceWatch.objects.get(pk=1).last_notified_price == Decimal('400')
+    assert PriceWatch.objects.get(pk=4).last_seen_discount == Decimal('20')
+
+    # Nothing changed since, so nothing is sent again
+    assert evaluate_changed_products(sink) == 0
+
+
+def test_evaluate_changed_products_leaves_recent_changes_for_next_run(db):
+    make_product('400', minutes_ago=1)
+    PriceWatch.objects.create(email='user@example.com', product_id='42', max_price=Decimal('450'))
+
+    sink = MemorySink()
+    assert evaluate_changed_products(sink) == 0
+    cursor = WatchEvaluationCursor.objects.get(name=CURSOR_NAME)
+    assert cursor.evaluated_until < timezone.now() - datetime.timedelta(minutes=4)
+
+
+def test_price_watch_api_is_scoped_to_the_user(db):
+    make_product('400', discount=Decimal('15'))
+    PriceWatch.objects.create(email='other@example.com', product_id='42', max_price=Decimal('300'))
+    client = APIClient()
+    assert client.get('/api/watches/').status_code in (401, 403)
+
+    client.force_authenticate(User.objects.create(username='ana', email='ana@example.com'))
+    response = client.post('/api/watches/', {'product_id': '42', 'notify_on_discount': True,
+                                             'email': 'other@example.com'})
+    assert response.status_code == 201
+    assert response.data['email'] == 'ana@example.com'
+    assert response.data['last_seen_discount'] == '15.00'
+
+    watches = client.get('/api/watches/').data
+    assert [w['email'] for w in watches] == ['ana@example.com']
+    other = PriceWatch.objects.get(email='other@example.com')
+    assert client.get(f'/api/watches/{other.pk}/').status_code == 404
+
+
+def test_price_watch_api_resets_state_when_retargeted(db):
+    Product.objects.create(product_id='43', product_name='Tablet', price=Decimal('420'), discount=Decimal('5'),
+                           product_url='https://ebc.shop/tablet', image_url='https://ebc.shop/tablet.jpg')
+    notified = PriceWatch.objects.create(email='ana@example.com', product_id='42', max_price=Decimal('450'),
+                                         last_notified_price=Decimal('400'), last_seen_discount=Decimal('20'))
+    client = APIClient()
+    client.force_authenticate(User.objects.create(username='ana', email='ana@example.com'))
+
+    assert client.patch(f'/api/watches/{notified.pk}/', {'is_active': False}).status_code == 200
+    notified.refresh_from_db()
+    assert notified.last_notified_price == Decimal('400')
+
+    assert client.patch(f'/api/watches/{notified.pk}/', {'product_id': '43'}).status_code == 200
+    notified.refresh_from_db()
+    assert notified.last_notified_price is None
+    assert notified.last_seen_discount == Decimal('5')
+
+
+def test_price_watch_api_rejects_watches_that_never_trigger(db):
+    existing = PriceWatch.objects.create(email='ana@example.com', product_id='42', max_price=Decimal('450'))
+    client = APIClient()
+    client.force_authenticate(User.objects.create(username='ana', email='ana@example.com'))
+
+    assert client.post('/api/watches/', {'product_id': '42'}).status_code == 400
+    assert client.patch(f'/api/watches/{existing.pk}/', {'max_price': None}, format='json').status_code == 400
+    assert client.patch(f'/api/watches/{existing.pk}/', {'max_price': None, 'notify_on_discount': True},
+                        format='json').status_code == 200